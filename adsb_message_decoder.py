@@ -0,0 +1,224 @@
+# Native DF17 airborne position decoder
+#
+# Replaces the pyModeS calls (pms.adsb.position / altitude / icao) in the receive path.
+# Scalar functions work on ADSBFrame objects, the *_batch functions on (N, 14) uint8
+# frame buffers such as the ones produced by encode_batch().
+#
+# Reference : https://mode-s.org/1090mhz/content/ads-b/3-airborne-position.html
+#             https://github.com/junzis/pyModeS/blob/master/pyModeS/decoder/bds/bds05.py
+
+import math
+import numpy as np
+
+from adsb_message_encoder import latz, nl, nl_batch
+
+
+CPR_SCALE = 131072.0            # 2^17
+AIR_DLAT_EVEN = 360.0 / (4 * latz)
+AIR_DLAT_ODD = 360.0 / (4 * latz - 1)
+
+DECODED_DTYPE = np.dtype([
+    ('icao', np.uint32),
+    ('altitude', np.float64),
+    ('latitude', np.float64),
+    ('longitude', np.float64),
+])
+
+
+def _gray2int(gray, nbits):
+    n = gray
+    shift = 1
+    while shift < nbits:
+        n = n ^ (n >> shift)
+        shift <<= 1
+    return n
+
+
+def _altcode_to_altitude(alt12):
+    # 12-bit AC field (no M bit) of an airborne position message -> altitude in feet, None if invalid
+    if alt12 == 0:
+        return None
+
+    if alt12 & 0x010:
+        # Q bit set, 25 ft resolution: 11-bit N with the Q bit removed
+        n = ((alt12 & 0xFE0) >> 1) | (alt12 & 0x00F)
+        return n * 25 - 1000
+
+    # Q bit clear, 100 ft Gillham (Gray) code
+    # bit order (MSB first): C1 A1 C2 A2 C4 A4 B1 Q B2 D2 B4 D4
+    bit = lambda i: (alt12 >> (11 - i)) & 1
+    gc500 = (bit(9) << 7) | (bit(11) << 6) | (bit(1) << 5) | (bit(3) << 4) | (bit(5) << 3) | (bit(6) << 2) | (bit(8) << 1) | bit(10)
+    gc100 = (bit(0) << 2) | (bit(2) << 1) | bit(4)
+
+    n500 = _gray2int(gc500, 8)
+    n100 = _gray2int(gc100, 3)
+    if n100 in (0, 5, 6):
+        return None
+    if n100 == 7:
+        n100 = 5
+    if n500 % 2:
+        n100 = 6 - n100
+
+    return n500 * 500 + n100 * 100 - 1300
+
+
+def icao(frame):
+    return "%06X" % frame.icao
+
+
+def altitude(frame):
+    return _altcode_to_altitude((frame.value >> 60) & 0xFFF)
+
+
+def _cpr_fields(frame):
+    v = frame.value
+    return (v >> 58) & 1, ((v >> 41) & 0x1FFFF) / CPR_SCALE, ((v >> 24) & 0x1FFFF) / CPR_SCALE
+
+
+def airborne_position(even, odd, odd_is_latest=True):
+    # Global (unambiguous) decode of an even/odd pair. Returns (lat, lon), or (None, None)
+    # when the two frames fall in different NL zones.
+    _, lat_even, lon_even = _cpr_fields(even)
+    _, lat_odd, lon_odd = _cpr_fields(odd)
+
+    j = math.floor(59 * lat_even - 60 * lat_odd + 0.5)
+    rlat_even = AIR_DLAT_EVEN * (j % 60 + lat_even)
+    rlat_odd = AIR_DLAT_ODD * (j % 59 + lat_odd)
+
+    if rlat_even >= 270:
+        rlat_even -= 360
+    if rlat_odd >= 270:
+        rlat_odd -= 360
+
+    if nl(rlat_even) != nl(rlat_odd):
+        return None, None
+
+    if odd_is_latest:
+        lat = rlat_odd
+        nl_lat = nl(lat)
+        ni = max(nl_lat - 1, 1)
+        m = math.floor(lon_even * (nl_lat - 1) - lon_odd * nl_lat + 0.5)
+        lon = (360.0 / ni) * (m % ni + lon_odd)
+    else:
+        lat = rlat_even
+        nl_lat = nl(lat)
+        ni = max(nl_lat, 1)
+        m = math.floor(lon_even * (nl_lat - 1) - lon_odd * nl_lat + 0.5)
+        lon = (360.0 / ni) * (m % ni + lon_even)
+
+    if lon > 180:
+        lon -= 360
+
+    return lat, lon
+
+
+def airborne_position_with_ref(frame, lat_ref, lon_ref):
+    # Local decode of a single frame against a reference position within 180 NM (e.g. the GCS)
+    f, lat_cpr, lon_cpr = _cpr_fields(frame)
+
+    dlat = 360.0 / (4 * latz - f)
+    j = math.floor(lat_ref / dlat) + math.floor(0.5 + (lat_ref % dlat) / dlat - lat_cpr)
+    lat = dlat * (j + lat_cpr)
+
+    ni = nl(lat) - f
+    dlon = 360.0 / ni if ni > 0 else 360.0
+    m = math.floor(lon_ref / dlon) + math.floor(0.5 + (lon_ref % dlon) / dlon - lon_cpr)
+    lon = dlon * (m + lon_cpr)
+
+    return lat, lon
+
+
+###############################################################
+
+# Batch versions, frames is an (N, 14) uint8 array
+
+def icao_batch(frames):
+    frames = np.asarray(frames, dtype=np.uint8)
+    return ((frames[:, 1].astype(np.uint32) << 16) | (frames[:, 2].astype(np.uint32) << 8) | frames[:, 3])
+
+
+def altitude_batch(frames):
+    # Altitude in feet, NaN where the altitude code is invalid
+    frames = np.asarray(frames, dtype=np.uint8)
+    alt12 = (frames[:, 5].astype(np.int64) << 4) | (frames[:, 6] >> 4)
+
+    qbit = (alt12 & 0x010) != 0
+    alt_q = (((alt12 & 0xFE0) >> 1) | (alt12 & 0x00F)) * 25.0 - 1000.0
+
+    bit = lambda i: (alt12 >> (11 - i)) & 1
+    gc500 = (bit(9) << 7) | (bit(11) << 6) | (bit(1) << 5) | (bit(3) << 4) | (bit(5) << 3) | (bit(6) << 2) | (bit(8) << 1) | bit(10)
+    gc100 = (bit(0) << 2) | (bit(2) << 1) | bit(4)
+
+    n500 = _gray2int(gc500, 8)
+    n100 = _gray2int(gc100, 3)
+    valid_g = (n100 != 0) & (n100 != 5) & (n100 != 6)
+    n100 = np.where(n100 == 7, 5, n100)
+    n100 = np.where(n500 % 2 == 1, 6 - n100, n100)
+    alt_g = np.where(valid_g, n500 * 500.0 + n100 * 100.0 - 1300.0, np.nan)
+
+    return np.where(alt12 == 0, np.nan, np.where(qbit, alt_q, alt_g))
+
+
+def _cpr_fields_batch(frames):
+    frames = np.asarray(frames, dtype=np.uint8).astype(np.int64)
+    f = (frames[:, 6] >> 2) & 1
+    lat_cpr = ((frames[:, 6] & 0x3) << 15) | (frames[:, 7] << 7) | (frames[:, 8] >> 1)
+    lon_cpr = ((frames[:, 8] & 0x1) << 16) | (frames[:, 9] << 8) | frames[:, 10]
+    return f, lat_cpr / CPR_SCALE, lon_cpr / CPR_SCALE
+
+
+def airborne_position_batch(even, odd, odd_is_latest=True):
+    # Global decode of N even/odd pairs. NaN where the pair straddles an NL zone boundary.
+    _, lat_even, lon_even = _cpr_fields_batch(even)
+    _, lat_odd, lon_odd = _cpr_fields_batch(odd)
+
+    j = np.floor(59 * lat_even - 60 * lat_odd + 0.5)
+    rlat_even = AIR_DLAT_EVEN * (j % 60 + lat_even)
+    rlat_odd = AIR_DLAT_ODD * (j % 59 + lat_odd)
+    rlat_even = np.where(rlat_even >= 270, rlat_even - 360, rlat_even)
+    rlat_odd = np.where(rlat_odd >= 270, rlat_odd - 360, rlat_odd)
+
+    same_zone = nl_batch(rlat_even) == nl_batch(rlat_odd)
+
+    odd_is_latest = np.broadcast_to(np.asarray(odd_is_latest, dtype=bool), rlat_odd.shape)
+    lat = np.where(odd_is_latest, rlat_odd, rlat_even)
+    nl_lat = nl_batch(lat)
+    ni = np.where(odd_is_latest, np.maximum(nl_lat - 1, 1), np.maximum(nl_lat, 1))
+    m = np.floor(lon_even * (nl_lat - 1) - lon_odd * nl_lat + 0.5)
+    lon = (360.0 / ni) * (m % ni + np.where(odd_is_latest, lon_odd, lon_even))
+    lon = np.where(lon > 180, lon - 360, lon)
+
+    return np.where(same_zone, lat, np.nan), np.where(same_zone, lon, np.nan)
+
+
+def airborne_position_with_ref_batch(frames, lat_ref, lon_ref):
+    # Local decode of N single frames against reference position(s)
+    f, lat_cpr, lon_cpr = _cpr_fields_batch(frames)
+
+    dlat = 360.0 / (4 * latz - f)
+    j = np.floor(lat_ref / dlat) + np.floor(0.5 + (lat_ref % dlat) / dlat - lat_cpr)
+    lat = dlat * (j + lat_cpr)
+
+    ni = nl_batch(lat) - f
+    dlon = 360.0 / np.maximum(ni, 1)
+    m = np.floor(lon_ref / dlon) + np.floor(0.5 + (lon_ref % dlon) / dlon - lon_cpr)
+    lon = dlon * (m + lon_cpr)
+
+    return lat, lon
+
+
+def decode_batch(frames, odd_is_latest=True):
+    """
+    Decode a tick's worth of receptions in one call.
+    frames: (N, 2, 14) uint8 even/odd buffer (as returned by encode_batch)
+    Returns a DECODED_DTYPE structured array of N (icao, altitude, latitude, longitude).
+    """
+    frames = np.asarray(frames, dtype=np.uint8)
+    even = frames[:, 0]
+    odd = frames[:, 1]
+
+    decoded = np.empty(frames.shape[0], dtype=DECODED_DTYPE)
+    decoded['icao'] = icao_batch(even)
+    decoded['altitude'] = altitude_batch(even)
+    decoded['latitude'], decoded['longitude'] = airborne_position_batch(even, odd, odd_is_latest)
+    return decoded
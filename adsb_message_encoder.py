@@ -1,33 +1,60 @@
 # https://github.com/nzkarit/ADSB-Out/blob/master/ModeSLocation.py
 
+import bisect
 import math
 
 latz = 15
 
-def encode_alt_modes(alt, bit13):
-    # need to better understand as the >50175 feet not working
-    # TODO >50175 feet
-    mbit = False
-    qbit = True
-    # For altitudes -1000<=X<=50175 feet, set bit 8 AKA the Q bit to true which means 25 feet resoulution
-    # For >50175 set the qbit to False and use 100 feet resoultion
-    if alt > 50175:
-        qbit = False
-        encalt = int((int(alt) + 1000) / 100)
-    else:
-        qbit = True
-        encalt = int((int(alt) + 1000) / 25)
+# Mode S altitude code (12-bit AC field of an airborne position message), precomputed for every 25 ft step
+#  - -1000 <= X <= 50175 feet : Q bit set, N = (X + 1000) / 25 in the 11 remaining bits
+#  - above 50175 feet         : Q bit clear, 100 ft Gillham (Gray) code, up to 126700 feet
+# Bit order of the field (MSB first): C1 A1 C2 A2 C4 A4 B1 Q B2 D2 B4 D4
 
-    if bit13 is True:
-        tmp1 = (encalt & 0xfe0) << 2
-        tmp2 = (encalt & 0x010) << 1
+ALT_Q_MAX_N = 0x7FF            # last 25 ft step (50175 feet)
+ALT_GILLHAM_MAX_FT = 126700
 
-    else:
-        tmp1 = (encalt & 0xff8) << 1
-        tmp2 = 0
+def gillham_encode(alt):
+    # 100 ft Gillham code of alt (a multiple of 100, -1200 <= alt <= 126700), as a 12-bit AC field with Q = 0
+    v = (alt + 1300) // 100
+    n500 = (v - 1) // 5
+    n100 = (v - 1) % 5 + 1
+    if n500 % 2:
+        n100 = 6 - n100
+    if n100 == 5:
+        n100 = 7
 
-    return (encalt & 0x0F) | tmp1 | tmp2 | (mbit << 6) | (qbit << 4)
+    gc500 = n500 ^ (n500 >> 1)   # D2 D4 A1 A2 A4 B1 B2 B4
+    gc100 = n100 ^ (n100 >> 1)   # C1 C2 C4
 
+    g = lambda value, nbits, i: (value >> (nbits - 1 - i)) & 1
+    bits = [g(gc100, 3, 0), g(gc500, 8, 2), g(gc100, 3, 1), g(gc500, 8, 3), g(gc100, 3, 2), g(gc500, 8, 4),
+            g(gc500, 8, 5), 0, g(gc500, 8, 6), g(gc500, 8, 0), g(gc500, 8, 7), g(gc500, 8, 1)]
+
+    code = 0
+    for bit in bits:
+        code = (code << 1) | bit
+    return code
+
+def _make_alt_code_table():
+    table = []
+    for k in range((ALT_GILLHAM_MAX_FT + 1000) // 25 + 1):
+        if k <= ALT_Q_MAX_N:
+            table.append(((k & 0x7F0) << 1) | 0x10 | (k & 0x0F))
+        else:
+            table.append(gillham_encode(((k * 25 - 1000) // 100) * 100))
+    return table
+
+ALT_CODE_TABLE = _make_alt_code_table()
+
+def encode_alt_modes(alt, bit13):
+    # alt in feet. bit13 = True gives the 13-bit AC field (with the M bit) used by surveillance replies,
+    # airborne position messages use the 12-bit field.
+    k = min(max(int((int(alt) + 1000) / 25), 0), len(ALT_CODE_TABLE) - 1)
+    code = ALT_CODE_TABLE[k]
+
+    if bit13 is True:
+        code = ((code & 0xFC0) << 1) | (code & 0x3F)   # insert M = 0 in front of B1
+    return code
 
 def nz(ctype):
     """
@@ -48,11 +75,38 @@ def dlat(ctype, surface):
     else:
         return tmp / nzcalc
 
-def nl(declat_in):
+def nl_formula(declat_in):
+    # Closed-form NL, only used to build NL_TRANSITIONS below.
     if abs(declat_in) >= 87.0:
-        return 1.0
+        return 1
     return math.floor( (2.0*math.pi) * math.acos(1.0- (1.0-math.cos(math.pi/(2.0*latz))) / math.cos( (math.pi/180.0)*abs(declat_in) )**2 )**-1)
 
+def _make_nl_transitions():
+    # NL is a step function of |lat|: 59 at the equator, dropping by one at each of the
+    # transition latitudes, down to 1 at 87 degrees and above.
+    # NL_TRANSITIONS[i] is the smallest |lat| where NL < NL_MAX - i, found by bisecting
+    # nl_formula() down to the last float so the table gives the exact same steps.
+    nl_max = nl_formula(0.0)
+    transitions = []
+    lo = 0.0
+    for k in range(nl_max, 1, -1):
+        hi = 87.0
+        while math.nextafter(lo, hi) < hi:
+            mid = (lo + hi) / 2
+            if mid <= lo or mid >= hi:
+                mid = math.nextafter(lo, hi)
+            if nl_formula(mid) < k:
+                hi = mid
+            else:
+                lo = mid
+        transitions.append(hi)
+    return nl_max, transitions
+
+NL_MAX, NL_TRANSITIONS = _make_nl_transitions()
+
+def nl(declat_in):
+    return NL_MAX - bisect.bisect_right(NL_TRANSITIONS, abs(declat_in))
+
 def dlon(declat_in, ctype, surface):
     if surface:
         tmp = 90.0
@@ -141,7 +195,56 @@ def crc(msg, encode=False):
     # last 24 bits
     reminder = ''.join(msgbin[-24:])
     return reminder
-    
+
+###############################################################
+
+# Table-driven CRC-24 engine
+# Same generator as GENERATOR above (x^24 + ... + 1 -> 0x1FFF409), but processed
+# a whole byte at a time through a 256-entry table instead of bit by bit on strings.
+#
+#  - crc24(frame[:11])  -> parity bits to append to a 88-bit DF17 payload
+#  - crc24(frame)       -> syndrome of a full 112-bit frame (0 means parity is OK)
+
+import numpy
+
+CRC24_POLY = 0xFFF409
+
+def _make_crc24_table():
+    table = []
+    for byte in range(256):
+        reg = byte << 16
+        for _ in range(8):
+            if reg & 0x800000:
+                reg = ((reg << 1) ^ CRC24_POLY) & 0xFFFFFF
+            else:
+                reg = (reg << 1) & 0xFFFFFF
+        table.append(reg)
+    return table
+
+CRC24_TABLE = _make_crc24_table()
+CRC24_TABLE_NP = numpy.array(CRC24_TABLE, dtype=numpy.uint32)
+
+def crc24(data, nbytes=14):
+    """Mode-S CRC-24 remainder of a byte string (or of an int holding nbytes bytes)."""
+    if isinstance(data, int):
+        data = data.to_bytes(nbytes, "big")
+
+    table = CRC24_TABLE
+    reg = 0
+    for byte in data:
+        reg = ((reg << 8) & 0xFFFFFF) ^ table[(reg >> 16) ^ byte]
+    return reg
+
+def crc24_batch(frames):
+    """CRC-24 remainder of every row of an (N, nbytes) uint8 array. Returns uint32 array of N."""
+    frames = numpy.asarray(frames, dtype=numpy.uint8)
+    frames = frames.reshape(-1, frames.shape[-1])
+
+    reg = numpy.zeros(frames.shape[0], dtype=numpy.uint32)
+    for i in range(frames.shape[1]):
+        reg = ((reg << 8) & 0xFFFFFF) ^ CRC24_TABLE_NP[(reg >> 16) ^ frames[:, i]]
+    return reg
+
 ###############################################################
 
 '''
@@ -259,11 +362,11 @@ def manchester_encode(byte):
 import numpy
 #from scipy.signal import hilbert
 
-def df17_pos_rep_encode(ca, icao, tc, ss, nicsb, alt, time, lat, lon, surface):
+def df17_pos_rep_encode_bytes(ca, icao, tc, ss, nicsb, alt, time, lat, lon, surface):
 
     format = 17
 
-    enc_alt = encode_alt_modes(alt, surface)
+    enc_alt = encode_alt_modes(alt, False)
     #print "Alt(%r): %X " % (surface, enc_alt)
 
     #encode that position
@@ -288,14 +391,11 @@ def df17_pos_rep_encode(ca, icao, tc, ss, nicsb, alt, time, lat, lon, surface):
     df17_even_bytes.append((evenenclon>>8) & 0xff)   
     df17_even_bytes.append((evenenclon   ) & 0xff)
 
-    df17_str = "{0:02x}{1:02x}{2:02x}{3:02x}{4:02x}{5:02x}{6:02x}{7:02x}{8:02x}{9:02x}{10:02x}".format(*df17_even_bytes[0:11])
-    #print df17_str , "%X" % bin2int(crc(df17_str+"000000", encode=True)) , "%X" % get_parity(hex2bin(df17_str+"000000"), extended=True)
-    df17_crc = bin2int(crc(df17_str+"000000", encode=True))
+    df17_crc = crc24(bytes(df17_even_bytes))
 
     df17_even_bytes.append((df17_crc>>16) & 0xff)
     df17_even_bytes.append((df17_crc>> 8) & 0xff)
     df17_even_bytes.append((df17_crc    ) & 0xff)
-    df17_even_str = "{0:02x}{1:02x}{2:02x}{3:02x}{4:02x}{5:02x}{6:02x}{7:02x}{8:02x}{9:02x}{10:02x}{11:02x}{12:02x}{13:02x}".format(*df17_even_bytes[0:14])
  
     ff = 1
     df17_odd_bytes = []
@@ -312,48 +412,49 @@ def df17_pos_rep_encode(ca, icao, tc, ss, nicsb, alt, time, lat, lon, surface):
     df17_odd_bytes.append((oddenclon>>8) & 0xff)   
     df17_odd_bytes.append((oddenclon   ) & 0xff)
 
-    df17_str = "{0:02x}{1:02x}{2:02x}{3:02x}{4:02x}{5:02x}{6:02x}{7:02x}{8:02x}{9:02x}{10:02x}".format(*df17_odd_bytes[0:11])
-    df17_crc = bin2int(crc(df17_str+"000000", encode=True))
+    df17_crc = crc24(bytes(df17_odd_bytes))
 
     df17_odd_bytes.append((df17_crc>>16) & 0xff)
     df17_odd_bytes.append((df17_crc>> 8) & 0xff)
-    df17_odd_bytes.append((df17_crc    ) & 0xff)    
-    df17_odd_str = "{0:02x}{1:02x}{2:02x}{3:02x}{4:02x}{5:02x}{6:02x}{7:02x}{8:02x}{9:02x}{10:02x}{11:02x}{12:02x}{13:02x}".format(*df17_odd_bytes[0:14])
-    
-    return (df17_even_str, df17_odd_str)
-
-def frame_1090es_ppm_modulate(even, odd):
-    ppm = [ ]
-
-    for i in range(48):    # pause
-        ppm.append( 0 )
-
-    ppm.append( 0xA1 )   # preamble
-    ppm.append( 0x40 )
-    
-    for i in range(len(even)):
-        word16 = numpy.packbits(manchester_encode(~even[i]))
-        ppm.append(word16[0])
-        ppm.append(word16[1])
+    df17_odd_bytes.append((df17_crc    ) & 0xff)
 
+    return (bytes(df17_even_bytes), bytes(df17_odd_bytes))
 
-    for i in range(100):    # pause
-        ppm.append( 0 )
+def df17_pos_rep_encode(ca, icao, tc, ss, nicsb, alt, time, lat, lon, surface):
+    # Hex string version of df17_pos_rep_encode_bytes(), as in the original ADSB-Out encoder
+    (df17_even, df17_odd) = df17_pos_rep_encode_bytes(ca, icao, tc, ss, nicsb, alt, time, lat, lon, surface)
+    return (df17_even.hex(), df17_odd.hex())
 
-    ppm.append( 0xA1 )   # preamble
-    ppm.append( 0x40 )
+# Manchester code of every byte value, as 2 bytes (same bits as manchester_encode(~byte))
+MANCHESTER_TABLE = numpy.packbits(numpy.array([manchester_encode(~b) for b in range(256)], dtype=numpy.uint8), axis=1)
 
-    for i in range(len(odd)):
-        word16 = numpy.packbits(manchester_encode(~odd[i]))
-        ppm.append(word16[0])
-        ppm.append(word16[1])
+# HackRF I/Q samples of every PPM byte value: each bit becomes an (I, Q) pair of 127 or 0
+IQ_TABLE = numpy.repeat(numpy.unpackbits(numpy.arange(256, dtype=numpy.uint8)[:, None], axis=1) * 127, 2, axis=1).astype(numpy.uint8)
 
-    for i in range(48):    # pause
-        ppm.append( 0 )
+# PPM buffer layout of an even/odd frame pair:
+# 48 bytes pause | preamble | even frame | 100 bytes pause | preamble | odd frame | 48 bytes pause
+PPM_PREAMBLE = (0xA1, 0x40)
+PPM_EVEN_OFFSET = 48
+PPM_ODD_OFFSET = PPM_EVEN_OFFSET + 2 + 28 + 100
+PPM_FRAME_BYTES = PPM_ODD_OFFSET + 2 + 28 + 48
+IQ_FRAME_BYTES = PPM_FRAME_BYTES * 16
 
-    #print '[{}]'.format(', '.join(hex(x) for x in ppm))
-    
-    return bytearray(ppm)
+def frame_1090es_ppm_modulate(even, odd):
+    # even, odd: 14 bytes each (bytes, list of ints, uint8 array or ADSBFrame)
+    frames = numpy.frombuffer(bytes(even) + bytes(odd), dtype=numpy.uint8).reshape(1, 2, 14)
+    return bytearray(frame_1090es_ppm_modulate_batch(frames)[0].tobytes())
+
+def frame_1090es_ppm_modulate_batch(frames):
+    # (N, 2, 14) uint8 even/odd frames -> (N, PPM_FRAME_BYTES) uint8 PPM buffer
+    frames = numpy.asarray(frames, dtype=numpy.uint8).reshape(-1, 2, 14)
+    n = frames.shape[0]
+
+    ppm = numpy.zeros((n, PPM_FRAME_BYTES), dtype=numpy.uint8)
+    manchester = MANCHESTER_TABLE[frames].reshape(n, 2, 28)
+    for i, offset in enumerate((PPM_EVEN_OFFSET, PPM_ODD_OFFSET)):
+        ppm[:, offset:offset + 2] = PPM_PREAMBLE
+        ppm[:, offset + 2:offset + 30] = manchester[:, i]
+    return ppm
 
 def hackrf_raw_IQ_format(ppm):
     """
@@ -372,17 +473,101 @@ def hackrf_raw_IQ_format(ppm):
     #    print i, real_signal[i], int(analytic_signal[i])
     """
 
-    signal = []
-    bits = numpy.unpackbits(numpy.asarray(ppm, dtype=numpy.uint8))
-    for bit in bits:
-        if bit == 1:
-            I = 127
-            Q = 127
-        else:
-            I = 0
-            Q = 0
-        signal.append(I)
-        signal.append(Q)
+    return bytearray(IQ_TABLE[numpy.asarray(ppm, dtype=numpy.uint8)].tobytes())
 
-    return bytearray(signal)
-    
+def hackrf_raw_IQ_format_batch(frames, out=None):
+    """
+    Modulate N even/odd frame pairs ((N, 2, 14) uint8) straight into one I/Q buffer.
+    out: optional preallocated C-contiguous (N, IQ_FRAME_BYTES) uint8 array, filled in place.
+    Returns the (N, IQ_FRAME_BYTES) buffer.
+    """
+    ppm = frame_1090es_ppm_modulate_batch(frames)
+    n = ppm.shape[0]
+    if out is None:
+        out = numpy.empty((n, IQ_FRAME_BYTES), dtype=numpy.uint8)
+    numpy.take(IQ_TABLE, ppm, axis=0, out=out.reshape(n, PPM_FRAME_BYTES, 16))
+    return out
+
+###############################################################
+
+# Batch (NumPy) DF17 airborne position encoder
+# Same output as df17_pos_rep_encode() above, but for a whole fleet at once.
+# Every step (altitude code, CPR, CRC) is an array operation over all aircraft.
+
+ALT_CODE_TABLE_NP = numpy.array(ALT_CODE_TABLE, dtype=numpy.int64)
+
+def encode_alt_modes_batch(alt, bit13):
+    # Array version of encode_alt_modes(): one table lookup per aircraft
+    alt = numpy.asarray(alt, dtype=numpy.float64)
+    k = numpy.clip(numpy.trunc((numpy.trunc(alt) + 1000) / 25), 0, len(ALT_CODE_TABLE) - 1).astype(numpy.intp)
+    code = ALT_CODE_TABLE_NP[k]
+
+    if bit13 is True:
+        code = ((code & 0xFC0) << 1) | (code & 0x3F)
+    return code
+
+NL_TRANSITIONS_NP = numpy.array(NL_TRANSITIONS, dtype=numpy.float64)
+
+def nl_batch(declat_in):
+    # Array version of nl(), same transition table
+    abslat = numpy.abs(numpy.asarray(declat_in, dtype=numpy.float64))
+    return NL_MAX - numpy.searchsorted(NL_TRANSITIONS_NP, abslat, side="right")
+
+def cpr_encode_batch(lat, lon, ctype, surface):
+    # Array version of cpr_encode(). Returns (yz, xz) int64 arrays.
+    lat = numpy.asarray(lat, dtype=numpy.float64)
+    lon = numpy.asarray(lon, dtype=numpy.float64)
+
+    if surface is True:
+        scalar = 2.**19
+    else:
+        scalar = 2.**17
+
+    dlati = dlat(ctype, False)
+    yz = numpy.floor(scalar * ((lat % dlati) / dlati) + 0.5)
+
+    dloni = 360.0 / numpy.maximum(nl_batch(lat) - ctype, 1)
+    xz = numpy.floor(scalar * ((lon % dloni) / dloni) + 0.5)
+
+    yz = yz.astype(numpy.int64) & (2**17-1)
+    xz = xz.astype(numpy.int64) & (2**17-1)
+
+    return (yz, xz)
+
+def encode_batch(icao, alt, lat, lon, ca=5, tc=11, ss=0, nicsb=0, time=0, surface=False):
+    """
+    Encode N airborne position reports at once.
+    icao, alt, lat, lon are arrays (or scalars) of length N, icao as 24-bit ints.
+    Returns an (N, 2, 14) uint8 array; frames[:, 0] is the even frame, frames[:, 1] the odd one.
+    """
+    icao = numpy.atleast_1d(numpy.asarray(icao, dtype=numpy.int64))
+    alt, lat, lon = numpy.broadcast_arrays(numpy.atleast_1d(alt), numpy.atleast_1d(lat), numpy.atleast_1d(lon))
+    n = max(icao.shape[0], alt.shape[0])
+    icao = numpy.broadcast_to(icao, (n,))
+
+    enc_alt = encode_alt_modes_batch(alt, False)
+
+    frames = numpy.empty((n, 2, 14), dtype=numpy.uint8)
+
+    # header and altitude are shared by the even and odd frame
+    frames[:, :, 0] = (17 << 3) | ca
+    frames[:, :, 1] = ((icao >> 16) & 0xff)[:, None]
+    frames[:, :, 2] = ((icao >> 8) & 0xff)[:, None]
+    frames[:, :, 3] = (icao & 0xff)[:, None]
+    frames[:, :, 4] = (tc << 3) | (ss << 1) | nicsb
+    frames[:, :, 5] = ((enc_alt >> 4) & 0xff)[:, None]
+
+    for ff in (0, 1):
+        yz, xz = cpr_encode_batch(lat, lon, ff, surface)
+        frames[:, ff, 6] = ((enc_alt & 0xf) << 4) | (time << 3) | (ff << 2) | (yz >> 15)
+        frames[:, ff, 7] = (yz >> 7) & 0xff
+        frames[:, ff, 8] = ((yz & 0x7f) << 1) | (xz >> 16)
+        frames[:, ff, 9] = (xz >> 8) & 0xff
+        frames[:, ff, 10] = xz & 0xff
+
+    parity = crc24_batch(frames[:, :, :11].reshape(-1, 11)).reshape(n, 2)
+    frames[:, :, 11] = (parity >> 16) & 0xff
+    frames[:, :, 12] = (parity >> 8) & 0xff
+    frames[:, :, 13] = parity & 0xff
+
+    return frames
@@ -1,16 +1,84 @@
+import math
 import numpy as np
-import random
-import time
+from typing import NamedTuple, Optional, List, Tuple
 
 from adsbmessage import ADSBMessage
-import pyModeS as pms
+from adsbframe import ADSBFrame, correct_batch
+import phy
+import garbling
+from simclock import WallClock
+from seeding import default_rng, RandomBlocks
+from jammer import jammer_list
+from adsb_message_encoder import crc24_batch
+from adsb_message_decoder import icao_batch
+
+
+# Result of transmit_batch(), one row per drone
+TRANSMIT_DTYPE = np.dtype([
+    ('frames', np.uint8, (2, 14)),  # received even/odd frames (potentially corrupted)
+    ('delay', np.float64),          # propagation delay in ns
+    ('corrupted', np.bool_),
+    ('snr', np.float64),            # dB
+    ('spoofed', np.bool_),
+    ('jammed', np.bool_),
+    ('garbled', np.bool_),          # lost to an overlapping squitter (only with tx_time, see garbling.py)
+    ('corrected', np.bool_),        # CRC errors repaired by the receiver (error_correction > 0)
+])
+
+class TransmitResult(NamedTuple):
+    """Result of ADSBChannel.transmit()."""
+    even: ADSBFrame                 # Received even message (potentially corrupted)
+    odd: ADSBFrame                  # Received odd message (potentially corrupted)
+    delay_ns: float                 # Propagation delay
+    corrupted: bool                 # Message has been corrupted or not
+    snr_db: float                   # Signal-to-noise ratio
+    spoofed: bool                   # For n_scen_stat.py; the signal was spoofed
+    jammed: bool                    # For n_scen_stat.py; at least one bit was flipped by the jammer
+    # For n_scen_stat.py; (bit start time, jammer power / frequency) of every bit,
+    # shows how the jammer creates its noise in time sequence. None unless transmit(bit_stats=True).
+    # In PHY mode they come from the sampled jammer waveform (no jitter) at the bit times.
+    bit_power_jammer: Optional[List[Tuple[float, float]]] = None
+    bit_frequency_jammer: Optional[List[Tuple[float, float]]] = None
+    corrected: bool = False         # CRC errors were repaired by the receiver (error_correction > 0)
+    # For n_scen_stat.py; (jammers, 112) power of every jammer at every bit in dBm, with bit_stats=True.
+    # bit_power_jammer is their sum (in mW), bit_frequency_jammer the frequency of the strongest one.
+    bit_power_jammers: Optional[np.ndarray] = None
+
+
+# Start time of every bit of a frame, in us (8 us preamble, 1 us per bit; same as ADSBMessage.get_bit_timings)
+BIT_START_US = 8.0 + np.arange(112) * 1.0
+
 
 class ADSBChannel:
-    def __init__(self, error_rate=0.01, frequency=1090e6, noise_figure_db=5.0):
-        self.error_rate = np.float64(error_rate)
-        self.frequency = np.float64(frequency)
-        self.noise_figure_db = np.float64(noise_figure_db)
-        self.light_speed = np.float64(3e8)  # Speed of light in m/s
+    def __init__(self, error_rate=0.01, frequency=1090e6, noise_figure_db=5.0, recorder=None, phy_mode=False, clock=None,
+                 bandwidth_hz=1e6, rng=None, error_correction=0):
+        self.error_rate = float(error_rate)
+        self.frequency = float(frequency)
+        self.noise_figure_db = float(noise_figure_db)
+        self.light_speed = 3e8  # Speed of light in m/s
+
+        # Link budget constants, computed once instead of for every message
+        self.wavelength = self.light_speed / self.frequency
+        self.bandwidth_hz = float(bandwidth_hz)
+        self.noise_power_dbm = self.thermal_noise_power(self.bandwidth_hz)
+
+        # PHY mode: modulate the frames, add AWGN + sampled jammer waveform and demodulate (see phy.py),
+        # instead of drawing a bit error probability for each bit.
+        self.phy_mode = phy_mode
+
+        # WallClock (real sleep) by default; pass a shared SimClock to run in virtual time
+        self.clock = clock or WallClock()
+
+        # Random stream of this channel (numpy Generator, see seeding.py)
+        self.rng = default_rng(rng)
+        self._uniform = RandomBlocks(self.rng)
+
+        # Receiver-side CRC error correction: repair up to this many (0, 1 or 2) bit errors per frame
+        self.error_correction = error_correction
+
+        # Optional IQRecorder, captures the I/Q samples of every transmitted frame pair
+        # (as sent: after the spoofer, before jamming, noise and error correction), stamped with the send time
+        self.recorder = recorder
 
     @staticmethod
     def _haversine_distance(lat1, lon1, lat2, lon2):
@@ -27,57 +95,57 @@ class ADSBChannel:
     def free_space_path_loss(self, distance):
         if distance <= 0:
             return 0  # Avoid infinite loss
-        wavelength = self.light_speed / self.frequency
-        path_loss_db = 20 * np.log10(4 * np.pi * distance / wavelength)
+        path_loss_db = 20 * math.log10(4 * math.pi * distance / self.wavelength)
         return path_loss_db
 
+    def free_space_path_loss_batch(self, distances):
+        # free_space_path_loss() for an array of distances
+        distances = np.asarray(distances, dtype=np.float64)
+        safe = np.where(distances <= 0, 1.0, distances)
+        path_loss_db = 20 * np.log10(4 * np.pi * safe / self.wavelength)
+        return np.where(distances <= 0, 0.0, path_loss_db)
+
     def thermal_noise_power(self, bandwidth_hz):
-        k = np.float64(1.38e-23)  # Boltzmann constant in J/K
-        T = np.float64(290)  # Standard temperature in Kelvin
+        k = 1.38e-23  # Boltzmann constant in J/K
+        T = 290  # Standard temperature in Kelvin
         noise_power_watts = k * T * bandwidth_hz
-        noise_power_dbm = 10 * np.log10(noise_power_watts) + 30
+        noise_power_dbm = 10 * math.log10(noise_power_watts) + 30
         return noise_power_dbm
 
+    def _noise_power(self, bandwidth_hz):
+        # Precomputed noise floor for the channel bandwidth, computed only for other bandwidths
+        if bandwidth_hz == self.bandwidth_hz:
+            return self.noise_power_dbm
+        return self.thermal_noise_power(bandwidth_hz)
 
-    def corrupt_bit(self, msg: str, bit_index: int):
-        byte_array = bytearray.fromhex(msg)
 
+    def corrupt_bit(self, msg: ADSBFrame, bit_index: int):
         # Corrupt a specific bit in the message
-        # This is for jamming effect...
-        byte_index = bit_index // 8
-        bit_offset = 7 - (bit_index % 8)             # Flipping the MSB first..
-        byte_array[byte_index] ^= (1 << bit_offset)  # Flip the bit!
-
-        hex_string = byte_array.hex()
-        return hex_string
+        # This is for jamming effect... (flipping the MSB first)
+        return msg.flip_bit(bit_index)
 
 
-    def transmit(self, distance, original_message, tx_power_dbm=50, bandwidth_hz=1e6, jammer=None, spoofer=None):
+    def transmit(self, distance, original_message, tx_power_dbm=50, bandwidth_hz=1e6, jammer=None, spoofer=None, bit_stats=False):
         # Simulate ADS-B transmission with bit-level corruption
-        
-        # Returns:
-        # - df17_even_msg : Received even message (potentially corrupted)
-        # - df17_odd_msg  : Received odd message (potentially corrupted)
-        # - delay_ns: Propagation delay
-        # - corrupted: Message has been corrupted or not
-        # - snr_db: Signal-to-noise ratio
-        # - for_stat_spoofed, for_stat_jammed
-        #    : These are for n_scen_stat.py; flags for if signal was spoofed/jammed
-        # - for_stat_bit_power_jammer 
-        #    : This is for n_scen_stat.py; shows how jammer creates its' noise in time sequence
-
-        for_stat_bit_power_jammer = []
-        for_stat_bit_frequency_jammer = []
+        # Returns a TransmitResult.
+        # jammer can be one Jammer or a list of them, their powers add up (in mW) at every bit.
+        # The per-bit jammer telemetry is only collected with bit_stats=True, so normal runs don't allocate it.
+
+        for_stat_bit_power_jammer = [] if bit_stats else None
+        for_stat_bit_frequency_jammer = [] if bit_stats else None
+        for_stat_bit_power_jammers = None
+        jammers = jammer_list(jammer)
 
         delay_seconds = distance / self.light_speed
-        delay_ns = np.round(delay_seconds * 1e9, decimals=2)
+        delay_ns = round(delay_seconds * 1e9, 2)
 
         # Simulate propagation delay
-        time.sleep(delay_seconds)
+        sent_at = self.clock.time()
+        self.clock.sleep(delay_seconds)
         
         path_loss_db = self.free_space_path_loss(distance)
         rx_power_dbm = tx_power_dbm - path_loss_db
-        noise_power_dbm = self.thermal_noise_power(bandwidth_hz)
+        noise_power_dbm = self._noise_power(bandwidth_hz)
 
         # Encode the message into df17 format
         result_df17_even, result_df17_odd = original_message.encode()
@@ -100,39 +168,80 @@ class ADSBChannel:
                 result_df17_odd  = spoofed_df17_odd
                 for_stat_spoofed = True
 
-        # Apply jamming effects if a spoofer is present
-        if jammer:
-            # Simulate bit-by-bit transmission (for realistic jamming experience...)
-            for bit_index in range(original_message.TOTAL_BITS):
-                bit_start_us, _ = original_message.get_bit_timing(bit_index)
-                
-                # Calculate jamming effect for this bit
-                jamming_power = jammer.calculate_jamming_effect(
-                    bit_start_us,
-                    original_message.latitude,
-                    original_message.longitude,
-                    for_stat_bit_frequency_jammer
+        # The frames as transmitted: after the spoofer, before any channel effect
+        if self.recorder is not None:
+            self.recorder.record_pair(result_df17_even, result_df17_odd, result_df17_even.icao, sent_at)
+
+        preamble_lost = False
+
+        # The message reaches the receiver now, on simulation time
+        now = self.clock.time()
+        bit_start_us = original_message.get_bit_timings()
+        profiles = None
+
+        if self.phy_mode:
+            # Sample-level transmission: the jammer (if any) is part of the received waveform
+            frames = np.frombuffer(result_df17_even.to_bytes() + result_df17_odd.to_bytes(), dtype=np.uint8).reshape(1, 2, 14)
+            received, preamble_found, interference_dbm = phy.transceive(
+                frames, rx_power_dbm, noise_power_dbm + self.noise_figure_db, jammers, self.rng, start_time=now
+            )
+
+            received_df17_even = ADSBFrame.from_bytes(received[0, 0])
+            received_df17_odd = ADSBFrame.from_bytes(received[0, 1])
+            if jammers and (received_df17_even != result_df17_even or received_df17_odd != result_df17_odd):
+                for_stat_jammed = True
+
+            result_df17_even = received_df17_even
+            result_df17_odd = received_df17_odd
+            preamble_lost = not preamble_found.all()
+            snr_db = rx_power_dbm - interference_dbm[0]
+
+        # Apply jamming effects if a jammer is present
+        elif jammers:
+            # Bit-by-bit transmission (for realistic jamming experience...), evaluated for all bits in one array pass
+            # (jammers, bits) jamming power of every jammer (cached profiles, see Jammer.power_profile)
+            profiles = [emitter.power_profile(bit_start_us, start_time=now) for emitter in jammers]
+            jammer_powers = np.stack([power for power, _ in profiles])
+            jammed_bits = (jammer_powers > float('-inf')).any(axis=0)
+
+            if jammed_bits.any():
+                # Bit-level SNR, noise floor and all jammers summed in mW
+                effective_jamming_power = 10 * np.log10(
+                    10**(noise_power_dbm / 10) + np.sum(10**(jammer_powers[:, jammed_bits] / 10), axis=0)
                 )
-                
-                if jamming_power > float('-inf'):
-                     # Calculate bit-level SNR
-                    effective_jamming_signal_power_dbm = 10 * np.log10(10**(noise_power_dbm / 10) + 10**(jamming_power / 10))
-                    bit_snr_db = snr_db - effective_jamming_signal_power_dbm
-
-                    # Probability of bit error based on SNR
-                    # The stronger the jammer signal power is, the more likely to flip a bit
-                    bit_error_prob = 0.5 * np.exp(-bit_snr_db / 10)
-
-                    # Apply bit corruption based on probability
-                    if random.random() < bit_error_prob:
-                        result_df17_even = self.corrupt_bit(result_df17_even, bit_index)
-                        result_df17_odd = self.corrupt_bit(result_df17_odd, bit_index)        
-                        for_stat_jammed = True
-
-                    for_stat_bit_power_jammer.append((bit_start_us, jamming_power))
-
-                else:
-                    for_stat_bit_power_jammer.append((bit_start_us, float('-inf')))
+                bit_snr_db = snr_db - effective_jamming_power
+
+                # Probability of bit error based on SNR
+                # The stronger the jammer signal power is, the more likely to flip a bit
+                bit_error_prob = 0.5 * np.exp(-bit_snr_db / 10)
+
+                # One random draw per bit, flipped bits become a single 112-bit XOR mask for both frames
+                flips = np.zeros(original_message.TOTAL_BITS, dtype=bool)
+                flips[jammed_bits] = self.rng.random(bit_error_prob.shape[0]) < bit_error_prob
+                if flips.any():
+                    mask = int.from_bytes(np.packbits(flips).tobytes(), "big")
+                    result_df17_even = result_df17_even.xor(mask)
+                    result_df17_odd = result_df17_odd.xor(mask)
+                    for_stat_jammed = True
+
+                # As before, the overall SNR uses the effective jamming power of the last jammed bit
+                effective_jamming_signal_power_dbm = effective_jamming_power[-1]
+
+        if bit_stats and jammers:
+            if profiles is None:
+                # PHY mode: the sampled waveform of every jammer (no jitter) at the bit times
+                profiles = [emitter.sampled_profile(bit_start_us, now) for emitter in jammers]
+            jammer_powers = np.stack([power for power, _ in profiles])
+            if len(jammers) == 1:
+                jamming_power, jamming_frequency = profiles[0]
+            else:
+                with np.errstate(divide='ignore'):
+                    jamming_power = 10 * np.log10(np.sum(10**(jammer_powers / 10), axis=0))
+                strongest = np.argmax(jammer_powers, axis=0)
+                jamming_frequency = np.stack([frequency for _, frequency in profiles])[strongest, np.arange(strongest.shape[0])]
+            for_stat_bit_power_jammers = jammer_powers
+            for_stat_bit_power_jammer = list(zip(bit_start_us.tolist(), jamming_power.tolist()))
+            for_stat_bit_frequency_jammer = list(zip(bit_start_us.tolist(), jamming_frequency.tolist()))
 
         # Calculate overall SNR
         snr_db -= effective_jamming_signal_power_dbm
@@ -141,22 +250,156 @@ class ADSBChannel:
         # Since we are now using the bit-by-bit transmission and have ability to corrupt some bits within the message,
         # corruption will be simulated that way, rather than just compensating random value to the position.
         # So, We will now use parity bit to check if message is corrupted :)
-        crc_result_even = pms.crc(result_df17_even, True)
-        crc_result_odd = pms.crc(result_df17_odd, True)
-        parity_even = int(result_df17_even[22:], 16) # extract 11th ~ 13th bytes
-        parity_odd = int(result_df17_odd[22:], 16) 
-
-        # print(parity_even, crc_result_even)
+        # CRC over the whole frame (data + parity) gives the syndrome, which is 0 when parity matches.
+        syndrome_even = result_df17_even.syndrome()
+        syndrome_odd = result_df17_odd.syndrome()
+
+        # Like dump1090, try to repair 1/2-bit errors before giving up on the frame
+        corrected = False
+        if self.error_correction and (syndrome_even != 0 or syndrome_odd != 0):
+            repaired_even, errors_even = result_df17_even.correct(self.error_correction)
+            repaired_odd, errors_odd = result_df17_odd.correct(self.error_correction)
+            if repaired_even is not None and repaired_odd is not None:
+                result_df17_even, result_df17_odd = repaired_even, repaired_odd
+                syndrome_even = syndrome_odd = 0
+                corrected = True
 
         corrupted = False
 
-        if crc_result_even != parity_even or crc_result_odd != parity_odd:
+        if syndrome_even != 0 or syndrome_odd != 0 or preamble_lost:
             corrupted = True
         
-        if snr_db < 0 or random.random() < self.error_rate:
+        if snr_db < 0 or self._uniform.random() < self.error_rate:
             corrupted = True  
 
-        return result_df17_even, result_df17_odd, delay_ns, corrupted, snr_db, for_stat_spoofed, for_stat_jammed, for_stat_bit_power_jammer, for_stat_bit_frequency_jammer
+        return TransmitResult(
+            result_df17_even, result_df17_odd, delay_ns, corrupted, snr_db,
+            for_stat_spoofed, for_stat_jammed, for_stat_bit_power_jammer, for_stat_bit_frequency_jammer, corrected,
+            for_stat_bit_power_jammers
+        )
+
+
+    def transmit_batch(self, distances, frames, tx_power_dbm=50, bandwidth_hz=1e6, jammer=None, spoofer=None, receiver_lat=None, receiver_lon=None,
+                       tx_time=None, receiver=None):
+        """
+        transmit() for a whole fleet tick: N drones transmit their frame pair at the same time.
+        :param distances: N distances to the receiver, in meters.
+        :param frames: (N, 2, 14) uint8 even/odd frames (e.g. ADSBMessage.encode_many()).
+        :param tx_power_dbm: Transmit power, scalar or N.
+        :param jammer: Optional Jammer or list of Jammers, their powers add up (in mW) at every bit.
+        :param receiver_lat, receiver_lon: Optional N receiver positions, the DIRECTIONAL jammer's beam gain is
+                                           evaluated towards each of them (towards its GCS if None).
+        :param tx_time: Optional N transmit times (seconds). When given, squitters overlapping at the
+                        receiver collide (garbling.garbled) and are marked garbled and corrupted.
+        :param receiver: Optional N receiver indices for the collision model, one receiver if None.
+        Returns a TRANSMIT_DTYPE structured array of N (frames, delay, corrupted, snr, spoofed, jammed, garbled).
+        """
+        distances = np.atleast_1d(np.asarray(distances, dtype=np.float64))
+        frames = np.array(frames, dtype=np.uint8).reshape(-1, 2, 14)
+        n = frames.shape[0]
+        jammers = jammer_list(jammer)
+
+        result = np.zeros(n, dtype=TRANSMIT_DTYPE)
+
+        delay_seconds = distances / self.light_speed
+        result['delay'] = np.round(delay_seconds * 1e9, decimals=2)
+
+        # All messages are in the air at the same time, the tick takes as long as the farthest one
+        sent_at = self.clock.time() if tx_time is None else tx_time
+        if n > 0:
+            self.clock.sleep(delay_seconds.max())
+
+        path_loss_db = self.free_space_path_loss_batch(distances)
+        rx_power_dbm = tx_power_dbm - path_loss_db
+        noise_power_dbm = self._noise_power(bandwidth_hz)
+        snr_db = rx_power_dbm - (noise_power_dbm + self.noise_figure_db)
+
+        effective_jamming_signal_power_dbm = np.zeros(n)
+        effective_spoofing_signal_power_dbm = np.zeros(n)
+        preamble_lost = np.zeros(n, dtype=bool)
+
+        # The spoofer keeps per-drone state, so it still sees the messages one by one
+        if spoofer:
+            for i in range(n):
+                even = ADSBFrame.from_bytes(frames[i, 0])
+                odd = ADSBFrame.from_bytes(frames[i, 1])
+                spoofed_df17_even, spoofed_df17_odd, spoofed = spoofer.spoof_message(even, odd)
+                if spoofed:
+                    spoofing_signal_power_dbm = spoofer.spoof_signal_power(snr_db[i])
+                    effective_spoofing_signal_power_dbm[i] = 10 * np.log10(10**(noise_power_dbm / 10) + 10**(spoofing_signal_power_dbm / 10))
+                    frames[i, 0] = np.frombuffer(spoofed_df17_even.to_bytes(), dtype=np.uint8)
+                    frames[i, 1] = np.frombuffer(spoofed_df17_odd.to_bytes(), dtype=np.uint8)
+                    result['spoofed'][i] = True
+
+        # The frames as transmitted: after the spoofer, before any channel effect
+        if self.recorder is not None:
+            self.recorder.record(frames, icao_batch(frames[:, 0]), sent_at)
+
+        # With transmit times, every message is jammed from its own arrival time on
+        arrival = None if tx_time is None else np.broadcast_to(np.asarray(tx_time, dtype=np.float64), (n,)) + delay_seconds
+
+        if self.phy_mode:
+            received, preamble_found, interference_dbm = phy.transceive(
+                frames, rx_power_dbm, noise_power_dbm + self.noise_figure_db, jammers, self.rng,
+                target_lat=receiver_lat, target_lon=receiver_lon, start_time=arrival
+            )
+            if jammers:
+                result['jammed'] = (received != frames).any(axis=(1, 2))
+
+            frames = received
+            preamble_lost = ~preamble_found.all(axis=1)
+            snr_db = rx_power_dbm - interference_dbm
+
+        elif jammers and n > 0:
+            # (jammers, N, 112) jamming power, the same bit timing (and cached profile) for every message
+            jammer_powers = np.stack([
+                np.broadcast_to(emitter.power_profile(BIT_START_US, messages=n, start_time=arrival,
+                                                      target_lat=receiver_lat, target_lon=receiver_lon)[0], (n, BIT_START_US.shape[0]))
+                for emitter in jammers
+            ])
+            jammed_bits = (jammer_powers > float('-inf')).any(axis=0)
+
+            # Noise floor and all jammers summed in mW
+            effective_jamming_power = 10 * np.log10(10**(noise_power_dbm / 10) + np.sum(10**(jammer_powers / 10), axis=0))
+            bit_snr_db = snr_db[:, None] - effective_jamming_power
+            bit_error_prob = 0.5 * np.exp(-bit_snr_db / 10)
+
+            flips = jammed_bits & (self.rng.random(jammed_bits.shape) < bit_error_prob)
+            mask = np.packbits(flips, axis=1)
+            frames ^= mask[:, None, :]
+            result['jammed'] = flips.any(axis=1)
+
+            # Effective jamming power of the last jammed bit of every message, as in transmit()
+            last_jammed = jammed_bits.shape[1] - 1 - np.argmax(jammed_bits[:, ::-1], axis=1)
+            effective_jamming_signal_power_dbm = np.where(
+                jammed_bits.any(axis=1), effective_jamming_power[np.arange(n), last_jammed], 0.0
+            )
+
+        snr_db = snr_db - effective_jamming_signal_power_dbm - effective_spoofing_signal_power_dbm
+
+        # Parity check of both frames at once
+        if self.error_correction:
+            # Repair in place where a frame pair is fully correctable
+            repaired = frames.reshape(-1, 14).copy()
+            syndrome, errors = correct_batch(repaired, self.error_correction)
+            syndrome = syndrome.reshape(n, 2)
+            fixed = (syndrome == 0).all(axis=1) & (errors.reshape(n, 2) > 0).any(axis=1)
+            frames[fixed] = repaired.reshape(n, 2, 14)[fixed]
+            result['corrected'] = fixed
+        else:
+            syndrome = crc24_batch(frames.reshape(-1, 14)).reshape(n, 2)
+        corrupted = (syndrome != 0).any(axis=1) | preamble_lost
+        corrupted |= (snr_db < 0) | (self.rng.random(n) < self.error_rate)
+
+        if tx_time is not None:
+            result['garbled'] = garbling.garbled(arrival, rx_power_dbm, receiver)
+            corrupted |= result['garbled']
+
+        result['frames'] = frames
+        result['corrupted'] = corrupted
+        result['snr'] = snr_db
+
+        return result
 
 
     # def corrupt_message(self, message):
@@ -0,0 +1,161 @@
+# Compact ADS-B (DF17) frame
+#
+# A 112-bit Mode S extended squitter is kept as a single Python int (MSB = first bit on air).
+# Bit flips, parity checks and field extraction are then plain integer operations,
+# and hex strings are only produced at the edges (printing, export, pyModeS).
+
+import itertools
+import numpy as np
+
+from adsb_message_encoder import crc24, crc24_batch
+
+
+# Syndrome -> error pattern table for receiver-side error correction (as dump1090 does).
+# CRC-24 is linear, so the syndrome of a damaged frame only depends on the flipped bits.
+# The 5 DF bits are never corrected, a "repair" there would turn the frame into another format.
+CORRECTION_FIRST_BIT = 5
+
+
+def _build_syndrome_table(nbits=112, first_bit=CORRECTION_FIRST_BIT):
+    # {syndrome: (112-bit error mask, number of bit errors)} for all 1- and 2-bit errors.
+    # A 2-bit pattern sharing its syndrome with another pattern is ambiguous and left out.
+    nbytes = nbits // 8
+    single = [(crc24(1 << (nbits - 1 - i), nbytes), 1 << (nbits - 1 - i)) for i in range(first_bit, nbits)]
+
+    table = {syndrome: (mask, 1) for syndrome, mask in single}
+    ambiguous = set()
+    for (s1, m1), (s2, m2) in itertools.combinations(single, 2):
+        syndrome = s1 ^ s2
+        if syndrome in table:
+            if table[syndrome][1] == 2:
+                ambiguous.add(syndrome)
+            continue
+        table[syndrome] = (m1 | m2, 2)
+    for syndrome in ambiguous:
+        del table[syndrome]
+    return table
+
+
+SYNDROME_TABLE = _build_syndrome_table()
+
+# Same table as sorted arrays for the batch path: syndromes, error masks as (K, 14) bytes, bit counts
+SYNDROME_KEYS = np.array(sorted(SYNDROME_TABLE), dtype=np.uint32)
+SYNDROME_MASKS = np.array(
+    [list(SYNDROME_TABLE[s][0].to_bytes(14, "big")) for s in SYNDROME_KEYS.tolist()], dtype=np.uint8
+).reshape(-1, 14)
+SYNDROME_ERRORS = np.array([SYNDROME_TABLE[s][1] for s in SYNDROME_KEYS.tolist()], dtype=np.uint8)
+
+
+def correct_batch(frames, max_errors=2):
+    """
+    Repair up to max_errors bit errors in every row of an (N, 14) uint8 frame array, in place.
+    Returns (syndrome after correction (N,) uint32, number of bits corrected (N,) uint8).
+    """
+    syndrome = crc24_batch(frames)
+    corrected = np.zeros(syndrome.shape[0], dtype=np.uint8)
+
+    damaged = np.flatnonzero(syndrome)
+    if damaged.shape[0] == 0 or max_errors <= 0:
+        return syndrome, corrected
+
+    index = np.minimum(np.searchsorted(SYNDROME_KEYS, syndrome[damaged]), SYNDROME_KEYS.shape[0] - 1)
+    found = (SYNDROME_KEYS[index] == syndrome[damaged]) & (SYNDROME_ERRORS[index] <= max_errors)
+    rows = damaged[found]
+    frames[rows] ^= SYNDROME_MASKS[index[found]]
+    syndrome[rows] = 0
+    corrected[rows] = SYNDROME_ERRORS[index[found]]
+    return syndrome, corrected
+
+
+class ADSBFrame:
+    __slots__ = ("value",)
+
+    NBITS = 112
+    NBYTES = 14
+
+    # Airborne position (TC 9-18) field offsets, counted from the LSB of the frame
+    ALT_SHIFT = 60          # 12-bit altitude code
+    LAT_CPR_SHIFT = 41      # 17-bit CPR latitude
+    LON_CPR_SHIFT = 24      # 17-bit CPR longitude
+    ALT_MASK = 0xFFF << ALT_SHIFT
+    CPR_MASK = ((1 << 34) - 1) << LON_CPR_SHIFT
+
+    def __init__(self, value: int):
+        self.value = value
+
+    @classmethod
+    def from_hex(cls, hexstr: str):
+        return cls(int(hexstr, 16))
+
+    @classmethod
+    def from_bytes(cls, data):
+        # data: 14 bytes (bytes, bytearray or a uint8 array row)
+        return cls(int.from_bytes(bytes(data), "big"))
+
+    def to_bytes(self) -> bytes:
+        return self.value.to_bytes(self.NBYTES, "big")
+
+    def hex(self) -> str:
+        return "%028x" % self.value
+
+    def flip_bit(self, bit_index: int):
+        # Flip one bit, bit_index 0 is the first (most significant) bit of the frame
+        return ADSBFrame(self.value ^ (1 << (self.NBITS - 1 - bit_index)))
+
+    def xor(self, mask: int):
+        # Flip every bit set in a 112-bit mask
+        return ADSBFrame(self.value ^ mask)
+
+    @property
+    def df(self) -> int:
+        return self.value >> 107
+
+    @property
+    def icao(self) -> int:
+        return (self.value >> 80) & 0xFFFFFF
+
+    @property
+    def me(self) -> int:
+        # 56-bit message (ME) field
+        return (self.value >> 24) & 0xFFFFFFFFFFFFFF
+
+    @property
+    def parity(self) -> int:
+        return self.value & 0xFFFFFF
+
+    def syndrome(self) -> int:
+        # CRC-24 over data + parity, 0 when the frame is intact
+        return crc24(self.value, self.NBYTES)
+
+    def crc_ok(self) -> bool:
+        return self.syndrome() == 0
+
+    def correct(self, max_errors=2):
+        """
+        Repair up to max_errors (1 or 2) bit errors with one syndrome table lookup.
+        Returns (frame, number of bits corrected); frame is None when the errors can't be corrected.
+        """
+        syndrome = self.syndrome()
+        if syndrome == 0:
+            return self, 0
+        entry = SYNDROME_TABLE.get(syndrome)
+        if entry is None or entry[1] > max_errors:
+            return None, 0
+        return ADSBFrame(self.value ^ entry[0]), entry[1]
+
+    def __eq__(self, other):
+        if isinstance(other, ADSBFrame):
+            return self.value == other.value
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.value)
+
+    def __bytes__(self):
+        return self.to_bytes()
+
+    def __str__(self):
+        return self.hex()
+
+    def __repr__(self):
+        return "ADSBFrame(%s)" % self.hex()
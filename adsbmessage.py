@@ -20,8 +20,10 @@
 
 # ADS-B message with bit-level access and timing
 
+import numpy as np
 import pyModeS as pms
 from adsb_message_encoder import *
+from adsbframe import ADSBFrame
 
 
 class ADSBMessage:
@@ -46,6 +48,9 @@ class ADSBMessage:
 	    self.PREAMBLE_DURATION_US = 8.0
 	    self.BIT_DURATION_US = 1.0  # 1μs per bit
 	    self.TOTAL_BITS = 112
+
+	    # Cached (even, odd) ADSBFrame pair, filled by encode() and patched by update()
+	    self._frames = None
 	    
 
 
@@ -58,10 +63,72 @@ class ADSBMessage:
 	    return start_time, end_time
 
 
+	def get_bit_timings(self):
+	    # Start time of every bit, as an array of TOTAL_BITS
+	    return self.PREAMBLE_DURATION_US + np.arange(self.TOTAL_BITS) * self.BIT_DURATION_US
+
+
 	def encode(self):
-	    surface = False
-	    (df17_even, df17_odd) = df17_pos_rep_encode(self.ca, self.icao24, self.tc, self.ss, self.nicsb, self.altitude, self.time, self.latitude, self.longitude, surface)
-	    return (df17_even, df17_odd)
+	    # Returns (even, odd) ADSBFrame pair.
+	    # The result is cached, so change the position through update() rather than the attributes.
+	    if self._frames is None:
+	        surface = False
+	        (df17_even, df17_odd) = df17_pos_rep_encode_bytes(self.ca, self.icao24, self.tc, self.ss, self.nicsb, self.altitude, self.time, self.latitude, self.longitude, surface)
+	        self._frames = (ADSBFrame.from_bytes(df17_even), ADSBFrame.from_bytes(df17_odd))
+	    return self._frames
+
+
+	def update(self, altitude=None, lat=None, lon=None):
+	    # Move the message to a new position and return the re-encoded (even, odd) pair.
+	    # Only the altitude and/or CPR fields are rewritten. Since CRC-24 is linear
+	    # (crc(a ^ b) == crc(a) ^ crc(b)), the new parity is the old one XOR the CRC of the field delta.
+	    if altitude is not None:
+	        self.altitude = altitude
+	    if lat is not None:
+	        self.latitude = lat
+	    if lon is not None:
+	        self.longitude = lon
+
+	    if self._frames is None:
+	        return self.encode()
+
+	    mask = 0
+	    fields = [0, 0]
+
+	    if altitude is not None:
+	        mask |= ADSBFrame.ALT_MASK
+	        enc_alt = (encode_alt_modes(self.altitude, False) & 0xFFF) << ADSBFrame.ALT_SHIFT
+	        fields[0] |= enc_alt
+	        fields[1] |= enc_alt
+
+	    if lat is not None or lon is not None:
+	        mask |= ADSBFrame.CPR_MASK
+	        for ff in (0, 1):
+	            yz, xz = cpr_encode(self.latitude, self.longitude, ff, False)
+	            fields[ff] |= (yz << ADSBFrame.LAT_CPR_SHIFT) | (xz << ADSBFrame.LON_CPR_SHIFT)
+
+	    frames = []
+	    for frame, field in zip(self._frames, fields):
+	        delta = (frame.value & mask) ^ field
+	        # delta only touches the 6 bytes in front of the parity, leading zero bytes don't change the CRC
+	        frames.append(ADSBFrame(frame.value ^ delta ^ crc24(delta >> 24, 6)))
+
+	    self._frames = tuple(frames)
+	    return self._frames
+
+
+	@staticmethod
+	def encode_many(messages):
+	    # Encode a whole fleet tick in one call.
+	    # Returns an (N, 2, 14) uint8 array of even/odd frames, in the order of messages.
+	    m = messages[0]
+	    return encode_batch(
+	        np.fromiter((msg.icao24 for msg in messages), dtype=np.int64, count=len(messages)),
+	        np.fromiter((msg.altitude for msg in messages), dtype=np.float64, count=len(messages)),
+	        np.fromiter((msg.latitude for msg in messages), dtype=np.float64, count=len(messages)),
+	        np.fromiter((msg.longitude for msg in messages), dtype=np.float64, count=len(messages)),
+	        ca=m.ca, tc=m.tc, ss=m.ss, nicsb=m.nicsb, time=m.time
+	    )
 
 
 
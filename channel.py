@@ -1,19 +1,23 @@
+import asyncio
 import random
-import time
+
+from simclock import WallClock
 
 
 
 class Channel:
-    def __init__(self, delay_mean=0.1, delay_std=0.05, error_rate=0.01):
+    def __init__(self, delay_mean=0.1, delay_std=0.05, error_rate=0.01, clock=None):
         """
         Initialize the channel with specified parameters.
         :param delay_mean: Mean of the transmission delay in seconds.
         :param delay_std: Standard deviation of the transmission delay.
         :param error_rate: Probability of a message being corrupted.
+        :param clock: Clock used for the delay (SimClock for virtual time), defaults to real time.
         """
         self.delay_mean = delay_mean
         self.delay_std = delay_std
         self.error_rate = error_rate
+        self.clock = clock or WallClock()
 
     def transmit(self, message):
         """
@@ -22,9 +26,19 @@ class Channel:
         :return: The received message after channel effects.
         """
         # Simulate transmission delay
-        delay = random.gauss(self.delay_mean, self.delay_std)
-        time.sleep(max(0, delay))
+        delay = self.draw_delay()
+        self.clock.sleep(max(0, delay))
+
+        return self.receive(message, delay)
 
+    def draw_delay(self):
+        return random.gauss(self.delay_mean, self.delay_std)
+
+    def receive(self, message, delay):
+        """
+        Channel effects applied when the message arrives.
+        :return: (received message, delay, corrupted)
+        """
         # Simulate message corruption
         if random.random() < self.error_rate:
             corrupted_message = self.corrupt_message(message)
@@ -44,3 +58,57 @@ class Channel:
         corrupted_message['longitude'] += random.uniform(-0.01, 0.01)
         corrupted_message['altitude'] += random.uniform(-10, 10)
         return corrupted_message
+
+
+class AsyncChannel(Channel):
+    """
+    Channel whose transmissions don't block each other.
+    Every send() waits for its own delay on the asyncio event loop, so any number of messages
+    can be in flight at once and a short delay overtakes a long one, as on a real link.
+    The delay and corruption model are the ones of Channel.
+    With a SimClock, the deliveries are events on the clock instead of real-time waits: while
+    messages are in flight, the clock jumps from one delivery to the next, so a run takes no real time.
+
+    Usage:
+        received_message, delay, corrupted = await channel.send(message)
+        results = await channel.send_all(messages)
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._in_flight = 0     # sends waiting for a delivery event on the clock (virtual time)
+        self._driver = None
+
+    async def send(self, message):
+        """
+        Transmit a message, resuming the caller when it arrives.
+        :return: (received message, delay, corrupted), like Channel.transmit().
+        """
+        delay = self.draw_delay()
+        if not hasattr(self.clock, 'schedule'):
+            await asyncio.sleep(max(0, delay))
+            return self.receive(message, delay)
+
+        # Virtual time: the delivery is an event on the shared clock
+        arrival = asyncio.get_running_loop().create_future()
+        self.clock.schedule(max(0, delay), arrival.set_result, None)
+        self._in_flight += 1
+        if self._driver is None or self._driver.done():
+            self._driver = asyncio.ensure_future(self._run_clock())
+        try:
+            await arrival
+        finally:
+            self._in_flight -= 1
+        return self.receive(message, delay)
+
+    async def _run_clock(self):
+        # Advance the clock event by event while deliveries are in flight. Every step first gives the loop
+        # one iteration, so woken and newly started senders run (and schedule) before time moves on.
+        while self._in_flight:
+            await asyncio.sleep(0)
+            if self._in_flight and not self.clock.step():
+                break
+
+    async def send_all(self, messages):
+        """Transmit all messages concurrently, results in the order of messages."""
+        return await asyncio.gather(*(self.send(message) for message in messages))
@@ -0,0 +1,96 @@
+# Mode S garbling / collision model
+#
+# An extended squitter occupies the channel for 120 us (8 us preamble + 112 bits). When two
+# squitters reach the same receiver with overlapping air time, the receiver sees both at once:
+# a squitter is still decoded when it is at least capture_ratio_db above every squitter it
+# overlaps with (capture effect), otherwise it is garbled.
+#
+# Overlaps are found with one sort over the arrival times of every receiver: the squitters
+# overlapping squitter i are the ones arriving less than 120 us before or after it, a contiguous
+# window of the sorted order (searchsorted). The strongest power in every window comes from a
+# sparse table of running maxima, so the whole batch is resolved without any pairwise checks.
+
+import numpy as np
+
+
+SQUITTER_DURATION_US = 120.0
+CAPTURE_RATIO_DB = 3.0
+
+
+def overlap_windows(arrival_s, receiver=None, duration_us=SQUITTER_DURATION_US):
+    """
+    Find the squitters that overlap each squitter at the same receiver.
+    :param arrival_s: N arrival times in seconds.
+    :param receiver: N receiver indices, all at one receiver if None.
+    Returns (order, lo, hi): order sorts the squitters by (receiver, arrival), and the squitters
+    overlapping squitter order[k] (itself included) are order[lo[k]:hi[k]].
+    """
+    arrival_s = np.asarray(arrival_s, dtype=np.float64)
+    n = arrival_s.shape[0]
+    if receiver is None:
+        receiver = np.zeros(n, dtype=np.int64)
+    receiver = np.asarray(receiver, dtype=np.int64)
+
+    if n == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+
+    order = np.lexsort((arrival_s, receiver))
+    t = arrival_s[order] - arrival_s.min()
+    r = receiver[order]
+    duration_s = duration_us * 1e-6
+
+    # Offset every receiver by more than the whole time span, so no window reaches into the next receiver
+    span = t.max() + 2 * duration_s + 1.0
+    rank = np.concatenate(([0], np.cumsum(r[1:] != r[:-1])))
+    key = t + rank * span
+
+    lo = np.searchsorted(key, key - duration_s, side='right')
+    hi = np.searchsorted(key, key + duration_s, side='left')
+    return order, lo, hi
+
+
+def _range_max(values, lo, hi):
+    # max(values[lo:hi]) for every (lo, hi) pair, -inf where the range is empty (sparse table)
+    n = values.shape[0]
+    levels = [values]
+    width = 1
+    while 2 * width <= n:
+        previous = levels[-1]
+        levels.append(np.maximum(previous[:-width], previous[width:]))
+        width *= 2
+
+    length = hi - lo
+    result = np.full(lo.shape[0], -np.inf)
+    nonempty = length > 0
+    k = np.zeros(lo.shape[0], dtype=np.int64)
+    k[nonempty] = np.floor(np.log2(length[nonempty])).astype(np.int64)
+    for level in np.unique(k[nonempty]).tolist():
+        rows = nonempty & (k == level)
+        table = levels[level]
+        result[rows] = np.maximum(table[lo[rows]], table[hi[rows] - (1 << level)])
+    return result
+
+
+def garbled(arrival_s, rx_power_dbm, receiver=None, capture_ratio_db=CAPTURE_RATIO_DB, duration_us=SQUITTER_DURATION_US):
+    """
+    Collision outcome of N squitters.
+    :param arrival_s: N arrival times at the receiver, in seconds.
+    :param rx_power_dbm: N received powers.
+    :param receiver: N receiver indices, all at one receiver if None.
+    Returns an N bool array, True where the squitter is lost to a collision.
+    """
+    rx_power_dbm = np.broadcast_to(np.asarray(rx_power_dbm, dtype=np.float64), np.shape(arrival_s))
+    order, lo, hi = overlap_windows(arrival_s, receiver, duration_us)
+    n = order.shape[0]
+    if n == 0:
+        return np.zeros(0, dtype=bool)
+
+    # Strongest other squitter in the own air time: the windows before and after the squitter itself
+    power = rx_power_dbm[order]
+    position = np.arange(n)
+    strongest_other = np.maximum(_range_max(power, lo, position), _range_max(power, position + 1, hi))
+
+    result = np.empty(n, dtype=bool)
+    result[order] = (hi - lo > 1) & (power - strongest_other < capture_ratio_db)
+    return result
@@ -1,6 +1,8 @@
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 
+import adsb_message_decoder as adsb_decoder
+
 class GCS:
     def __init__(self, lat, lon, alt=0):
         """Initialize GCS position."""
@@ -11,6 +13,16 @@ class GCS:
         """Receive updated position from the drone."""
         self.drone_positions[drone_id] = position
 
+    def receive_frames(self, frames):
+        """
+        Decode a whole tick of received (N, 2, 14) even/odd frames in one call
+        and update the drone positions. Returns the decoded structured array.
+        """
+        decoded = adsb_decoder.decode_batch(frames)
+        for icao, alt, lat, lon in decoded.tolist():
+            self.drone_positions["%06X" % icao] = (lat, lon, alt)
+        return decoded
+
     def plot_status(self, routes):
         """Plots the waypoints, drones, and GCS position."""
         fig = plt.figure()
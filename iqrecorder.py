@@ -0,0 +1,145 @@
+# Streaming IQ recorder
+#
+# Writes the HackRF I/Q samples of every transmitted frame pair into a growing
+# memory-mapped ".iq" file, so a whole simulation run can be captured without keeping
+# it in RAM. A small index of (time, icao, offset) is saved next to it ("<path>.idx.npy"),
+# so single messages can be sliced out later without reading the whole file.
+#
+# Usage:
+#   recorder = IQRecorder("results/run.iq")
+#   channel = ADSBChannel(recorder=recorder)
+#   ... run ...
+#   recorder.close()
+#
+#   recording = IQRecording("results/run.iq")
+#   iq = recording[10]          # uint8 I/Q samples of the 11th message
+
+import os
+import numpy as np
+
+from adsb_message_encoder import hackrf_raw_IQ_format_batch, IQ_FRAME_BYTES
+
+
+INDEX_DTYPE = np.dtype([
+    ('time', np.float64),
+    ('icao', np.uint32),
+    ('offset', np.uint64),
+])
+
+
+def index_path(path):
+    return path + ".idx.npy"
+
+
+class IQRecorder:
+    def __init__(self, path, initial_capacity=1024):
+        """
+        :param path: Output .iq file (raw interleaved uint8 I/Q, IQ_FRAME_BYTES per frame pair).
+        :param initial_capacity: Number of frame pairs to reserve at first; the file doubles when full.
+        """
+        self.path = path
+        self.count = 0
+        self.capacity = 0
+
+        self._iq = None
+        self._index = np.empty(0, dtype=INDEX_DTYPE)
+
+        # Create (or truncate) the file, then map it
+        open(self.path, "wb").close()
+        self._grow(max(1, initial_capacity))
+
+    def _grow(self, capacity):
+        if self._iq is not None:
+            self._iq.flush()
+            self._iq = None
+
+        with open(self.path, "r+b") as f:
+            f.truncate(capacity * IQ_FRAME_BYTES)
+
+        self._iq = np.memmap(self.path, dtype=np.uint8, mode="r+", shape=(capacity, IQ_FRAME_BYTES))
+        self._index = np.resize(self._index, capacity)
+        self.capacity = capacity
+
+    def record(self, frames, icao, timestamp):
+        """
+        Record N frame pairs.
+        :param frames: (N, 2, 14) uint8 even/odd frames.
+        :param icao: N ICAO addresses (ints), or one for all.
+        :param timestamp: N timestamps (seconds), or one for all.
+        """
+        frames = np.asarray(frames, dtype=np.uint8).reshape(-1, 2, 14)
+        n = frames.shape[0]
+
+        if self.count + n > self.capacity:
+            capacity = self.capacity
+            while self.count + n > capacity:
+                capacity *= 2
+            self._grow(capacity)
+
+        start = self.count
+        # Modulate straight into the mapped file
+        hackrf_raw_IQ_format_batch(frames, out=self._iq[start:start + n])
+
+        index = self._index[start:start + n]
+        index['time'] = timestamp
+        index['icao'] = icao
+        index['offset'] = (np.arange(start, start + n, dtype=np.uint64) * IQ_FRAME_BYTES)
+
+        self.count += n
+
+    def record_pair(self, even, odd, icao, timestamp):
+        """Record a single even/odd ADSBFrame pair."""
+        frames = np.frombuffer(bytes(even) + bytes(odd), dtype=np.uint8).reshape(1, 2, 14)
+        self.record(frames, icao, timestamp)
+
+    def flush(self):
+        self._iq.flush()
+        np.save(index_path(self.path), self._index[:self.count])
+
+    def close(self):
+        """Trim the file to the recorded size and write the index."""
+        if self._iq is None:
+            return
+
+        self.flush()
+        self._iq = None
+
+        with open(self.path, "r+b") as f:
+            f.truncate(self.count * IQ_FRAME_BYTES)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class IQRecording:
+    """Read-only view of a recording made by IQRecorder."""
+
+    def __init__(self, path):
+        self.path = path
+        self.index = np.load(index_path(path))
+
+        if len(self.index) > 0 and os.path.getsize(path) > 0:
+            self.iq = np.memmap(path, dtype=np.uint8, mode="r", shape=(len(self.index), IQ_FRAME_BYTES))
+        else:
+            self.iq = np.empty((0, IQ_FRAME_BYTES), dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, i):
+        # I/Q samples of message(s) i, only those pages are read from disk
+        return self.iq[i]
+
+    def select(self, icao=None, start_time=None, end_time=None):
+        """Row numbers of the messages matching an ICAO address and/or a time window."""
+        mask = np.ones(len(self.index), dtype=bool)
+        if icao is not None:
+            mask &= self.index['icao'] == icao
+        if start_time is not None:
+            mask &= self.index['time'] >= start_time
+        if end_time is not None:
+            mask &= self.index['time'] < end_time
+        return np.nonzero(mask)[0]
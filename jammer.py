@@ -1,197 +1,519 @@
 import numpy as np
-import random
-import time
 from typing import Optional, Dict, Tuple, List, Set
 import math
 
+from simclock import WallClock
+from seeding import default_rng
+from collections import OrderedDict
+
+# Per-jammer cache of power_profile() results without jitter: (jammer params, phase bucket, bit spacing) -> profile.
+# Holds at least PROFILE_CACHE_SIZE entries, and two for every phase bucket of a periodic waveform
+# (period / PROFILE_PHASE_RESOLUTION_US), so a jammer running for a long time never evicts its own phases.
+PROFILE_CACHE_SIZE = 1024
+PROFILE_PHASE_RESOLUTION_US = 0.5
+
 # jamming_type should be one of:
 # "CW"       # Continuous Wave
 # "PULSE"    # Pulsed Noise Jamming (Burst Jamming)
 # "SWEEP"    # Sweeping Jamming (Frequency Hopping Jammer)
 # "DIRECTIONAL" # Directional Jamming (Beamforming Jamming)
+#
+# Every type is its own class (CWJammer, PulseJammer, SweepJammer, DirectionalJammer) implementing
+# _base_profile(), which evaluates the power and frequency of a whole array of bit times at once.
+# Jammer(jamming_type, ...) is kept as a factory with the original signature.
+#
+# Waveforms run on simulation time: a bit is jammed according to (message start time on the jammer's
+# clock + bit offset), counted from the jammer's creation, so PULSE and SWEEP keep their phase across messages.
+
+
+def in_band_power(jamming_power_dbm, freq_difference):
+    """
+        power_reduction = (freq_difference / 0.5e6) * 3
+        This formula creates a simple linear relationship where:
+
+        freq_difference is how far the jammer frequency is from 1090 MHz
+        0.5e6 (500 kHz) is used as a reference bandwidth
+        3 is the maximum reduction in dB
+
+        So it works like this:
+
+        If freq_difference = 0 Hz: (0/500kHz) * 3 = 0 dB reduction
+        If freq_difference = 250kHz: (250kHz/500kHz) * 3 = 1.5 dB reduction
+        If freq_difference = 500kHz: (500kHz/500kHz) * 3 = 3 dB reduction
+
+        This assumes power reduction increases linearly with frequency difference...
+        Every 167kHz difference causes 1dB reduction (500kHz/3dB)
+        Maximum reduction is capped at 3dB at 500kHz offset
+
+        This is oversimplified because real Radio Frequency filters don't have this linear response.
+
+        Works on arrays, -inf outside the 500kHz bandwidth.
+    """
+    freq_difference = np.abs(freq_difference)
+    power_reduction = (freq_difference / 0.5e6) * 3
+    return np.where(freq_difference < 0.5e6, jamming_power_dbm - power_reduction, -np.inf)  # Within 500kHz bandwidth
+
+
+def bearing_deg(lat1, lon1, lat2, lon2):
+    # Initial bearing (azimuth, 0-360 degrees) from (lat1, lon1) to (lat2, lon2), works on arrays
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    delta_lon = lon2 - lon1
+
+    # sin(Δlon) * cos(lat2) gives us the east-west component
+    x = np.sin(delta_lon) * np.cos(lat2)
+
+    # cos(lat1) * sin(lat2) - sin(lat1) * coss(lat2) * cos(Δlon)
+    # gives us the north-south component
+    y = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(delta_lon)
+
+    # Initial bearing using arctan of y/x components, in degrees
+    return (np.degrees(np.arctan2(x, y)) + 360) % 360
+
+
+def jammer_list(jammer):
+    # None, one jammer or a list/tuple of jammers (several emitters at once) -> list of jammers
+    if jammer is None:
+        return []
+    if isinstance(jammer, (list, tuple)):
+        return list(jammer)
+    return [jammer]
+
+
+class JammerTimeline:
+    """
+    Power / frequency of a jammer materialized for a stretch of simulation time (BaseJammer.timeline()),
+    one sample every resolution_us. Per-message views are plain slices.
+    """
+
+    def __init__(self, start_time, resolution_us, power, frequency):
+        self.start_time = start_time          # simulation time (s) of the first sample
+        self.resolution_us = resolution_us
+        self.power = power                    # dBm, -inf where the jammer has no effect
+        self.frequency = frequency            # Hz
+
+    def __len__(self):
+        return self.power.shape[0]
+
+    def message(self, start_time, first_bit_us=8.0, bits=112, bit_duration_us=1.0):
+        """(power, frequency) views for the bits of a message starting at start_time (s)."""
+        step = int(round(bit_duration_us / self.resolution_us))
+        first = int(round(((start_time - self.start_time) * 1e6 + first_bit_us) / self.resolution_us))
+        last = first + (bits - 1) * step
+        if first < 0 or last >= len(self):
+            raise IndexError("message at %.6f s is outside the timeline" % start_time)
+        return self.power[first:last + 1:step], self.frequency[first:last + 1:step]
+
+
+class BaseJammer:
+    jamming_type = None
+    tone = False            # PHY model (phy.jammer_waveform): a carrier at the profile frequency, otherwise noise
+    cache_profiles = True   # power_profile() from the phase-bucketed profile cache, else evaluated at the exact phase
 
-class Jammer:
     def __init__(self,
-                    jamming_type: str,
                     jamming_power_dbm: float,         # Base transmission power
                     center_freq: float = 1090e6,      # Center frequency (Hz) - defaults to ADS-B frequency
+                    clock=None,                       # Shared SimClock, real time if None
+                    rng=None):                        # numpy Generator (see seeding.py)
+
+        # Common parameters
+        self.jamming_power_dbm = jamming_power_dbm
+        self.center_freq = center_freq
+
+        # Random stream of this jammer
+        self.rng = default_rng(rng)
+
+        # Internal timing
+        self.clock = clock or WallClock()
+        self.start_time = self.clock.time()
+
+        # LRU cache of the profiles of this jammer (see power_profile())
+        self._profile_cache = OrderedDict()
+
+
+    def calculate_jamming_effect(self, bit_time_us, target_lat, target_lon, for_stat_bit_frequency_jammer):
+        # Calculates jamming power at given time and target location
+        # Returns jamming power in dBm
+        power, frequency = self.power_profile(np.array([bit_time_us], dtype=np.float64), target_lat=target_lat, target_lon=target_lon)
+        for_stat_bit_frequency_jammer.append((bit_time_us, float(frequency.flat[0])))
+        return float(power.flat[0])
+
+
+    def calculate_jamming_effects(self, bit_times_us, target_lat, target_lon):
+        # Vectorized calculate_jamming_effect() for a whole message, see power_profile().
+        # Returns (jamming power in dBm, jammer frequency in Hz) arrays, -inf where the jammer has no effect.
+        return self.power_profile(bit_times_us, target_lat=target_lat, target_lon=target_lon)
+
+
+    def _profile_params(self):
+        # Everything the waveform depends on, part of the profile cache key
+        return (type(self).__name__, self.jamming_power_dbm, self.center_freq)
+
+
+    def _phase_us(self, elapsed_us):
+        # Where the periodic waveform is, elapsed_us after the jammer started (scalar or array)
+        return np.zeros_like(elapsed_us)
+
+
+    def _period_us(self):
+        # Period of the waveform, None if it doesn't change over time
+        return None
+
+
+    def _profile_cache_size(self):
+        period = self._period_us()
+        if period is None:
+            return PROFILE_CACHE_SIZE
+        return max(PROFILE_CACHE_SIZE, 2 * (int(math.ceil(period / PROFILE_PHASE_RESOLUTION_US)) + 1))
+
+
+    def _base_profile(self, relative_times_us, phase_us):
+        # Power / frequency of every bit without the random jitter, and where the jitter applies.
+        # relative_times_us: bit times from the first bit, phase_us: waveform phase at the first bit
+        # (a (messages, 1) array in sampled_profile(), so implementations should broadcast over it).
+        n = relative_times_us.shape[0]
+        return np.full(n, -np.inf), np.full(n, -np.inf), np.zeros(n, dtype=bool)
+
+
+    def _cached_profile(self, bucket, relative):
+        key = (self._profile_params(), bucket, relative.tobytes())
+
+        cache = self._profile_cache
+        profile = cache.get(key)
+        if profile is None:
+            profile = self._base_profile(relative, bucket * PROFILE_PHASE_RESOLUTION_US)
+            for array in profile:
+                array.flags.writeable = False
+            cache[key] = profile
+            if len(cache) > self._profile_cache_size():
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(key)
+        return profile
+
+
+    def power_profile(self, bit_times_us, messages=None, start_time=None, target_lat=None, target_lon=None):
+        """
+        Jamming power (dBm) and jammer frequency (Hz) for an array of bit times (us), -inf where the jammer
+        has no effect.
+
+        The deterministic part only depends on the jammer parameters, the waveform phase at the first bit
+        (bucketed to PROFILE_PHASE_RESOLUTION_US) and the bit spacing, so it comes from the jammer's LRU
+        cache; only the +/-0.1 dB jitter is drawn per call. Jammers with cache_profiles = False
+        are evaluated at the exact phase instead.
+        :param bit_times_us: Bit times from the start of the message.
+        :param messages: Optional number of messages sharing these bit times; the power is then
+                         (messages, len(bit_times_us)), with independent jitter per message.
+        :param start_time: Simulation time (s) the message starts, the jammer's clock.time() if None.
+                           With messages, an array of start times gives every message its own phase
+                           (the frequency is then (messages, len(bit_times_us)) too).
+        :param target_lat, target_lon: Optional receiver positions, only used by DirectionalJammer
+                                       (the other jammers radiate the same power everywhere).
+        """
+        bit_times_us = np.asarray(bit_times_us, dtype=np.float64)
+        first = bit_times_us[0] if bit_times_us.shape[0] else 0.0
+        relative = bit_times_us - first
+
+        if start_time is None:
+            start_time = self.clock.time()
+        elapsed_us = (np.asarray(start_time, dtype=np.float64) - self.start_time) * 1e6 + first
+        phase = self._phase_us(elapsed_us)
+
+        if phase.ndim > 0 and phase.size == 0:
+            # No messages (e.g. nobody in range this tick)
+            empty = np.empty((0, relative.shape[0]))
+            return empty, empty.copy()
+
+        if not self.cache_profiles:
+            power, frequency, jittered = self._base_profile(relative, float(phase) if phase.ndim == 0 else phase[:, None])
+        elif phase.ndim == 0:
+            power, frequency, jittered = self._cached_profile(int(np.rint(phase / PROFILE_PHASE_RESOLUTION_US)), relative)
+        else:
+            # One cached profile per distinct phase, gathered per message
+            buckets = np.rint(phase / PROFILE_PHASE_RESOLUTION_US).astype(np.int64)
+            unique, inverse = np.unique(buckets, return_inverse=True)
+            profiles = [self._cached_profile(bucket, relative) for bucket in unique.tolist()]
+            power, frequency, jittered = (np.stack(arrays)[inverse] for arrays in zip(*profiles))
+
+        shape = power.shape if messages is None or power.ndim > 1 else (messages,) + power.shape
+        power = power + np.where(jittered, self.rng.uniform(-0.1, 0.1, shape), 0.0)
+        return power, frequency
+
+
+    def sampled_profile(self, sample_times_us, start_time=None, target_lat=None, target_lon=None):
+        """
+        Power (dBm) and frequency (Hz) at every sample time (us from the message start) for the sampled PHY
+        model, without jitter. Same waveform as power_profile(), from _base_profile().
+        :param start_time: Simulation time (s) the message starts, the jammer's clock.time() if None.
+                           An array of start times gives every message its own phase: power and frequency
+                           are then (messages, len(sample_times_us)) where the waveform depends on time.
+        """
+        sample_times_us = np.asarray(sample_times_us, dtype=np.float64)
+        first = sample_times_us[0]
+        if start_time is None:
+            start_time = self.clock.time()
+        phase = self._phase_us((np.asarray(start_time, dtype=np.float64) - self.start_time) * 1e6 + first)
+        phase = float(phase) if phase.ndim == 0 else phase[:, None]
 
-                    # CW specific parameters
+        power, frequency, _ = self._base_profile(sample_times_us - first, phase)
+        return power, frequency
+
+
+    def timeline(self, start_time, duration_s, resolution_us=1.0):
+        """
+        Materialize the jammer for duration_s of simulation time from start_time (s), one sample every
+        resolution_us (jitter included), e.g. for a whole run. Slice per message with JammerTimeline.message().
+        """
+        n = int(math.ceil(duration_s * 1e6 / resolution_us))
+        relative = np.arange(n) * resolution_us
+        phase = float(self._phase_us(np.float64((start_time - self.start_time) * 1e6)))
+
+        power, frequency, jittered = self._base_profile(relative, phase)
+        power = power + np.where(jittered, self.rng.uniform(-0.1, 0.1, n), 0.0)
+        return JammerTimeline(start_time, resolution_us, power, frequency)
+
+
+class CWJammer(BaseJammer):
+    jamming_type = "CW"
+    tone = True
+
+    def __init__(self, jamming_power_dbm: float, center_freq: float = 1090e6,
                     offset_freq: float = 0.0,         # Frequency offset for CW (Hz)
+                    clock=None, rng=None):
+        super().__init__(jamming_power_dbm, center_freq, clock, rng)
+        self.offset_freq = offset_freq
 
-                    # Pulse noise specific parameters
+    def _profile_params(self):
+        return super()._profile_params() + (self.offset_freq,)
+
+    def _base_profile(self, relative_times_us, phase_us):
+        # Constant power at offset frequency.
+        # We don't need bit_time_us for CW.. since it just steadily sends a signal.
+        n = relative_times_us.shape[0]
+        frequency = np.full(n, self.center_freq + self.offset_freq)
+        power = np.full(n, in_band_power(self.jamming_power_dbm, self.center_freq + self.offset_freq - 1090e6))
+        return power, frequency, np.isfinite(power)
+
+
+class PulseJammer(BaseJammer):
+    jamming_type = "PULSE"
+    # A bucketed phase puts bits next to a pulse edge on the wrong side; the exact mod/compare
+    # costs no more than a cache lookup
+    cache_profiles = False
+
+    # Note: Be sure to set pulse_width_us larger than preamble(8us) period for this to work!!
+    #       So, in reality GCS will not be able to receive the message if the jammer corrupts preamble signal.
+    #       And targetting preamble signal only is more practical because it is only 8 micro seconds of noise,
+    #       which will be easier to deceive anomaly detection.
+    #       I couldn't really modify the simulator to the level where it actually transceives the "Signal".
+    #       However, the timing for preamble signal was implemented.
+    #       This is why we have to set pulse_width_us variable larger than 8 in order for it to work.
+
+    def __init__(self, jamming_power_dbm: float, center_freq: float = 1090e6,
                     pulse_width_us: float = 1.0,            # Pulse duration
                     pulse_repetition_freq: float = 1000.0,  # Pulse frequency
+                    clock=None, rng=None):
+        super().__init__(jamming_power_dbm, center_freq, clock, rng)
+        self.pulse_width_us = pulse_width_us
+        self.pulse_repetition_freq = pulse_repetition_freq
+
+    def _profile_params(self):
+        return super()._profile_params() + (self.pulse_width_us, self.pulse_repetition_freq)
+
+    def _phase_us(self, elapsed_us):
+        return elapsed_us % (1e6 / self.pulse_repetition_freq)
+
+    def _period_us(self):
+        return 1e6 / self.pulse_repetition_freq
+
+    def _base_profile(self, relative_times_us, phase_us):
+        pulse_period = 1e6 / self.pulse_repetition_freq
+        in_pulse = ((phase_us + relative_times_us) % pulse_period) < self.pulse_width_us
+        power = np.where(in_pulse, self.jamming_power_dbm, -np.inf)
+        frequency = np.where(in_pulse, self.center_freq, -np.inf)
+        return power, frequency, in_pulse
 
-                    # Sweep specific parameters
+
+class SweepJammer(BaseJammer):
+    jamming_type = "SWEEP"
+    tone = True
+
+    # Implement sweeping frequency jamming
+    # Simulates frequency of the signal changes overtime
+
+    def __init__(self, jamming_power_dbm: float, center_freq: float = 1090e6,
                     sweep_range_hz: float = 1e6,   # Frequency sweep range
                     sweep_time_us: float = 100.0,  # Time for one sweep
+                    clock=None, rng=None):
+        super().__init__(jamming_power_dbm, center_freq, clock, rng)
+        self.sweep_range_hz = sweep_range_hz
+        self.sweep_time_us = sweep_time_us
+
+    def _profile_params(self):
+        return super()._profile_params() + (self.sweep_range_hz, self.sweep_time_us)
+
+    def _phase_us(self, elapsed_us):
+        return elapsed_us % self.sweep_time_us
 
-                    # Directional specific parameters
+    def _period_us(self):
+        return self.sweep_time_us
+
+    def _base_profile(self, relative_times_us, phase_us):
+        # The frequency keeps sweeping during the message
+        sweep_position = ((phase_us + relative_times_us) % self.sweep_time_us) / self.sweep_time_us
+        frequency = self.center_freq - (self.sweep_range_hz / 2) + (sweep_position * self.sweep_range_hz)
+
+        power = in_band_power(self.jamming_power_dbm, frequency - 1090e6)
+        return power, frequency, np.isfinite(power)
+
+
+class DirectionalJammer(BaseJammer):
+    jamming_type = "DIRECTIONAL"
+
+    # Reference:
+    # https://www.youtube.com/watch?v=A1n5Hhwtz78&t=269s
+    # https://www.youtube.com/watch?v=xMP7_PDMSC8
+
+    def __init__(self, jamming_power_dbm: float, center_freq: float = 1090e6,
                     position: Tuple[float, float] = (0.0, 0.0),     # Jammer position
                     gcs_position: Tuple[float, float] = (0.0, 0.0), # GCS position
                     beam_width_deg: float = 30.0,                   # Beam width
-                    antenna_gain_dbi: float = 10.0):                # Antenna gain
-
-        # Common parameters
-        self.jamming_type = jamming_type
-        self.jamming_power_dbm = jamming_power_dbm
-        self.center_freq = center_freq
-        
-        # CW parameters
-        self.offset_freq = offset_freq
-        
-        # Pulse parameters
-        self.pulse_width_us = pulse_width_us
-        self.pulse_repetition_freq = pulse_repetition_freq
-        
-        # Sweep parameters
-        self.sweep_range_hz = sweep_range_hz
-        self.sweep_time_us = sweep_time_us
-        
-        # Directional parameters
+                    antenna_gain_dbi: float = 10.0,                 # Antenna gain
+                    clock=None, rng=None):
+        super().__init__(jamming_power_dbm, center_freq, clock, rng)
         self.position = position
         self.gcs_position = gcs_position
         self.beam_width_deg = beam_width_deg
         self.antenna_gain_dbi = antenna_gain_dbi
         self.direction_deg = self.calculate_bearing(self.position, self.gcs_position, uncertainity=True)
 
-        # Internal timing
-        self.start_time = time.time()
+        # Power towards the GCS, recomputed only when the geometry or the beam changes (see gcs_power())
+        self._gcs_key = None
+        self._gcs_power = None
 
+    def move(self, position=None, gcs_position=None, reaim=False):
+        # Relocate the jammer and/or the GCS it is aimed at. With reaim, the antenna is pointed (by eye) again.
+        if position is not None:
+            self.position = position
+        if gcs_position is not None:
+            self.gcs_position = gcs_position
+        if reaim:
+            self.direction_deg = self.calculate_bearing(self.position, self.gcs_position, uncertainity=True)
 
     # This is only for beamforming jammer.
     # Calculate azimuth to eventually align the jammer's beam to the gcs.
     # "Uncertainty" means that the attacker is setting the antenna orientation by eye measurement, which is not accurate.
     def calculate_bearing(self, jammer_position, gcs_position, uncertainity=False):
         # Calculate the bearing (azimuth) from the jammer to the GCS.
-        lat1, lon1 = np.radians(jammer_position)
-        lat2, lon2 = np.radians(gcs_position)
-        delta_lon = lon2 - lon1
-
-        # sin(Δlon) * cos(lat2) gives us the east-west component
-        x = math.sin(delta_lon) * math.cos(lat2)
-
-        # cos(lat1) * sin(lat2) - sin(lat1) * coss(lat2) * cos(Δlon)
-        # gives us the north-south component            
-        y = math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * math.cos(lat2) * math.cos(delta_lon)
-
-        # Calculate initial bearing using arctan of y/x components...
-        bearing = math.atan2(x, y)
-
-        # Convert bearing from radians to degrees
-        bearing_deg = math.degrees(bearing)
-
         # This is the optimal direction towards the GCS!
-        bearing_normalized = (bearing_deg + 360) % 360
+        bearing_normalized = float(bearing_deg(jammer_position[0], jammer_position[1], gcs_position[0], gcs_position[1]))
 
         if uncertainity:
-            bearing_normalized = bearing_normalized + random.uniform(0, self.beam_width_deg / 2)
+            bearing_normalized = bearing_normalized + self.rng.uniform(0, self.beam_width_deg / 2)
 
         return bearing_normalized
 
-
-
-    def calculate_jamming_effect(self, bit_time_us, target_lat, target_lon, for_stat_bit_frequency_jammer):
-        # Calculates jamming power at given time and target location
-        # Returns jamming power in dBm
-
+    def gain_towards(self, lat, lon):
         """
-            power_reduction = (freq_difference / 0.5e6) * 3
-            This formula creates a simple linear relationship where:
-
-            freq_difference is how far the jammer frequency is from 1090 MHz
-            0.5e6 (500 kHz) is used as a reference bandwidth
-            3 is the maximum reduction in dB
-
-            So it works like this:
-
-            If freq_difference = 0 Hz: (0/500kHz) * 3 = 0 dB reduction
-            If freq_difference = 250kHz: (250kHz/500kHz) * 3 = 1.5 dB reduction
-            If freq_difference = 500kHz: (500kHz/500kHz) * 3 = 3 dB reduction
-
-            This assumes power reduction increases linearly with frequency difference...
-            Every 167kHz difference causes 1dB reduction (500kHz/3dB)
-            Maximum reduction is capped at 3dB at 500kHz offset
-
-            This is oversimplified because real Radio Frequency filters don't have this linear response.
-            
+        Jamming power (dBm) through the beam pattern towards targets at (lat, lon), scalars or arrays,
+        and whether they are inside the beam. -20 dBm outside the beam.
         """
-
-        # bit_time_us is required for PULSE type jammer..(maybe?)
-        # target_lat, target_lon is required for DIRECTIONAL type jammer.
-        
-        if self.jamming_type == "CW":
-            # Constant power at offset frequency.
-            # We don't need bit_time_us for CW.. since it just steadily sends a signal.
-
-            freq_difference = abs(self.center_freq + self.offset_freq - 1090e6)
-            for_stat_bit_frequency_jammer.append((bit_time_us, self.center_freq + self.offset_freq))
-
-            if freq_difference < 0.5e6:  # Within 500kHz bandwidth
-                power_reduction = (freq_difference / 0.5e6) * 3
-                return self.jamming_power_dbm - power_reduction + random.uniform(-0.1, 0.1)
-
-
-                
-        if self.jamming_type == "PULSE":
-            # Note: Be sure to set pulse_width_us larger than preamble(8us) period for this to work!!
-            #       So, in reality GCS will not be able to receive the message if the jammer corrupts preamble signal.
-            #       And targetting preamble signal only is more practical because it is only 8 micro seconds of noise,
-            #       which will be easier to deceive anomaly detection.
-            #       I couldn't really modify the simulator to the level where it actually transceives the "Signal".
-            #       However, the timing for preamble signal was implemented.
-            #       This is why we have to set pulse_width_us variable larger than 8 in order for it to work.
-
-            pulse_period = 1e6 / self.pulse_repetition_freq
-            time_in_period = bit_time_us % pulse_period
-            if time_in_period < self.pulse_width_us:
-                for_stat_bit_frequency_jammer.append((bit_time_us, self.center_freq))
-                return self.jamming_power_dbm + random.uniform(-0.1, 0.1)
-            else:
-                for_stat_bit_frequency_jammer.append((bit_time_us, float('-inf')))
-            
-                
-        if self.jamming_type == "SWEEP":
-            # Implement sweeping frequency jamming
-            # Simulates frequency of the signal changes overtime
-
-            elapsed_time = (time.time() - self.start_time) * 1e6  # Convert to microseconds
-            sweep_position = (elapsed_time % self.sweep_time_us) / self.sweep_time_us
-            current_freq = self.center_freq - (self.sweep_range_hz / 2) + (sweep_position * self.sweep_range_hz)
-
-            freq_difference = abs(current_freq - 1090e6)
-            for_stat_bit_frequency_jammer.append((bit_time_us, current_freq))
-
-            if freq_difference < 0.5e6:  # Within 500kHz bandwidth
-                power_reduction = (freq_difference / 0.5e6) * 3
-                return self.jamming_power_dbm - power_reduction + random.uniform(-0.1, 0.1)
-
-
-        # Reference:
-        # https://www.youtube.com/watch?v=A1n5Hhwtz78&t=269s
-        # https://www.youtube.com/watch?v=xMP7_PDMSC8
-
-        if self.jamming_type == "DIRECTIONAL":
-            for_stat_bit_frequency_jammer.append((bit_time_us, self.center_freq))
-
-            # Calculate the exact azimuth
-            jammer_to_gcs_azimuth = self.calculate_bearing(self.position, self.gcs_position, uncertainity=False) 
-
-            angle_diff = abs((jammer_to_gcs_azimuth - self.direction_deg + 180) % 360 - 180)
-            
-            if angle_diff > self.beam_width_deg / 2:
-                return -20.0  # Outside the beam
-            
-            # Scale angle_diff to range [0,1] where 0 is center and 1 is edge of beam
-            
-            # Now calculate antenna gain based on direction to target...    
-            relative_gain = math.cos(math.radians(angle_diff) * 4) 
-            # Note: Multiplying 4 here means there are more power loss on edge of the beam
-            #       Also this means that maximum beam width should be pi/4(45 degrees)
-            #       Try to draw cosine graph if you don't understand.. :)
-
-            final_gain = self.antenna_gain_dbi * relative_gain
-            return self.jamming_power_dbm + final_gain + random.uniform(-0.1, 0.1)
-            
-        return float('-inf')
+        jammer_to_target_azimuth = bearing_deg(self.position[0], self.position[1], lat, lon)
+        angle_diff = np.abs((jammer_to_target_azimuth - self.direction_deg + 180) % 360 - 180)
+        in_beam = angle_diff <= self.beam_width_deg / 2
+
+        # Now calculate antenna gain based on direction to target...
+        relative_gain = np.cos(np.radians(angle_diff) * 4)
+        # Note: Multiplying 4 here means there are more power loss on edge of the beam
+        #       Also this means that maximum beam width should be pi/4(45 degrees)
+        #       Try to draw cosine graph if you don't understand.. :)
+
+        power = np.where(in_beam, self.jamming_power_dbm + self.antenna_gain_dbi * relative_gain, -20.0)
+        return power, in_beam
+
+    def gcs_power(self):
+        # gain_towards() the GCS, cached until the jammer, the GCS or the beam changes
+        key = (tuple(self.position[:2]), tuple(self.gcs_position[:2]), self.direction_deg, self.beam_width_deg,
+               self.antenna_gain_dbi, self.jamming_power_dbm)
+        if key != self._gcs_key:
+            power, in_beam = self.gain_towards(self.gcs_position[0], self.gcs_position[1])
+            self._gcs_power = (float(power), bool(in_beam))
+            self._gcs_key = key
+        return self._gcs_power
+
+    def _profile_params(self):
+        return super()._profile_params() + (
+            tuple(self.position), tuple(self.gcs_position), self.beam_width_deg, self.antenna_gain_dbi, self.direction_deg
+        )
+
+    def _base_profile(self, relative_times_us, phase_us):
+        # Same power for every bit, the geometry doesn't change within a message
+        n = relative_times_us.shape[0]
+        power, in_beam = self.gcs_power()
+        return np.full(n, power), np.full(n, self.center_freq), np.full(n, in_beam)
+
+    def power_profile(self, bit_times_us, messages=None, start_time=None, target_lat=None, target_lon=None):
+        """
+        BaseJammer.power_profile(), towards the GCS or, with target_lat / target_lon, towards every target
+        (one per message, a single target is shared by all messages): power and frequency are then
+        (messages, len(bit_times_us)), one bearing per target and independent jitter per message.
+        """
+        if target_lat is None or target_lon is None:
+            return super().power_profile(bit_times_us, messages, start_time)
+
+        n = np.asarray(bit_times_us).shape[0]
+        target_lat, target_lon = np.broadcast_arrays(np.atleast_1d(target_lat), np.atleast_1d(target_lon))
+        if messages is not None:
+            target_lat, target_lon = np.broadcast_to(target_lat, (messages,)), np.broadcast_to(target_lon, (messages,))
+        power, in_beam = self.gain_towards(target_lat, target_lon)
+        shape = (power.shape[0], n)
+        power = np.broadcast_to(power[:, None], shape) + np.where(in_beam[:, None], self.rng.uniform(-0.1, 0.1, shape), 0.0)
+        return power, np.full(shape, self.center_freq)
+
+    def sampled_profile(self, sample_times_us, start_time=None, target_lat=None, target_lon=None):
+        # Towards the GCS (cached) or, (targets, samples), towards every target. No time dependence.
+        if target_lat is None or target_lon is None:
+            return super().sampled_profile(sample_times_us, start_time)
+
+        n = np.asarray(sample_times_us).shape[0]
+        power, _ = self.gain_towards(*np.broadcast_arrays(np.atleast_1d(target_lat), np.atleast_1d(target_lon)))
+        shape = (power.shape[0], n)
+        return np.broadcast_to(power[:, None], shape), np.full(shape, self.center_freq)
+
+
+JAMMER_TYPES = {cls.jamming_type: cls for cls in (CWJammer, PulseJammer, SweepJammer, DirectionalJammer)}
+
+
+def Jammer(jamming_type: str,
+            jamming_power_dbm: float,         # Base transmission power
+            center_freq: float = 1090e6,      # Center frequency (Hz) - defaults to ADS-B frequency
+
+            # CW specific parameters
+            offset_freq: float = 0.0,         # Frequency offset for CW (Hz)
+
+            # Pulse noise specific parameters
+            pulse_width_us: float = 1.0,            # Pulse duration
+            pulse_repetition_freq: float = 1000.0,  # Pulse frequency
+
+            # Sweep specific parameters
+            sweep_range_hz: float = 1e6,   # Frequency sweep range
+            sweep_time_us: float = 100.0,  # Time for one sweep
+
+            # Directional specific parameters
+            position: Tuple[float, float] = (0.0, 0.0),     # Jammer position
+            gcs_position: Tuple[float, float] = (0.0, 0.0), # GCS position
+            beam_width_deg: float = 30.0,                   # Beam width
+            antenna_gain_dbi: float = 10.0,                 # Antenna gain
+
+            clock=None,                                     # Shared SimClock, real time if None
+            rng=None):                                      # numpy Generator (see seeding.py)
+    # Compatibility factory: builds the jammer class of jamming_type, ignoring the parameters of the other types
+    if jamming_type == "CW":
+        return CWJammer(jamming_power_dbm, center_freq, offset_freq, clock=clock, rng=rng)
+    if jamming_type == "PULSE":
+        return PulseJammer(jamming_power_dbm, center_freq, pulse_width_us, pulse_repetition_freq, clock=clock, rng=rng)
+    if jamming_type == "SWEEP":
+        return SweepJammer(jamming_power_dbm, center_freq, sweep_range_hz, sweep_time_us, clock=clock, rng=rng)
+    if jamming_type == "DIRECTIONAL":
+        return DirectionalJammer(jamming_power_dbm, center_freq, position, gcs_position, beam_width_deg, antenna_gain_dbi,
+                                 clock=clock, rng=rng)
+    raise ValueError("Unknown jamming_type %r, expected one of %s" % (jamming_type, ", ".join(JAMMER_TYPES)))
@@ -0,0 +1,40 @@
+import sys
+
+import numpy
+
+from jammer import Jammer
+from simclock import SimClock
+
+BIT_TIMES_US = 8.0 + numpy.arange(112)   # same as ADSBMessage.get_bit_timings()
+START_TIMES = 2000                       # random message start times checked
+PULSE_WIDTH_US = 15.0
+PULSE_REPETITION_FREQ = 2000.0
+
+
+def exact_pulse_mask(start_times):
+	# ((elapsed_us + bit) % period) < pulse_width, elapsed since the jammer's creation at time 0
+	period = 1e6 / PULSE_REPETITION_FREQ
+	elapsed_us = numpy.asarray(start_times)[:, None] * 1e6 + BIT_TIMES_US
+	return (elapsed_us % period) < PULSE_WIDTH_US
+
+
+def main():
+	clock = SimClock()
+	jammer = Jammer("PULSE", 45, pulse_width_us=PULSE_WIDTH_US, pulse_repetition_freq=PULSE_REPETITION_FREQ,
+		clock=clock, rng=numpy.random.default_rng(0))
+	start_times = numpy.random.default_rng(1).uniform(0.0, 10.0, START_TIMES)
+	expected = exact_pulse_mask(start_times)
+
+	scalar = numpy.array([numpy.isfinite(jammer.power_profile(BIT_TIMES_US, start_time=t)[0]) for t in start_times])
+	batch = numpy.isfinite(jammer.power_profile(BIT_TIMES_US, messages=START_TIMES, start_time=start_times)[0])
+	sampled = numpy.isfinite(jammer.sampled_profile(BIT_TIMES_US, start_times)[0])
+
+	failed = False
+	for name, mask in (('power_profile', scalar), ('power_profile batch', batch), ('sampled_profile', sampled)):
+		mismatches = int((mask != expected).any(axis=1).sum())
+		print(f"{name}: {START_TIMES} start times, {mismatches} mismatches")
+		failed |= mismatches > 0
+
+	sys.exit(1 if failed else 0)
+
+main()
@@ -1,4 +1,3 @@
-import time
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 from matplotlib.animation import FuncAnimation
@@ -7,13 +6,21 @@ from route import RouteGenerator
 from gcs import GCS
 from adsbchannel import ADSBChannel
 from adsbmessage import ADSBMessage
-import pyModeS as pms
+import adsb_message_decoder as adsb_decoder
 
 from jammer import Jammer
 from spoofer import Spoofer
+from iqrecorder import IQRecorder
+from simclock import SimClock
+from seeding import spawn_rngs
 from util import *
 
 
+# Master seed of the run (int for a reproducible run, None for a random one)
+SEED = None
+channel_rng, jammer_rng, spoofer_rng = spawn_rngs(SEED, 3)
+
+
 # Define central location (e.g., Washington, D.C.)
 # center_lat, center_lon = 38.8977, -77.0365  # White House location
 
@@ -46,16 +53,20 @@ drones = [
     for i in range(len(routes))
 ]
 
+# Simulation time shared by the channel and the jammer (1 animation frame = 1 second of flight)
+clock = SimClock()
+
 # Initialize the communication channel, jammer, and spoofer
-channel = ADSBChannel()
+channel = ADSBChannel(clock=clock, rng=channel_rng)
+# channel = ADSBChannel(clock=clock, rng=channel_rng, recorder=IQRecorder("results/adsb_attack.iq"))  # Capture the RF output of the run
 
-# jammer = Jammer(jamming_type="CW", jamming_power_dbm=45, center_freq=1090e6, offset_freq=0.2e6)
-# jammer = Jammer(jamming_type="PULSE",jamming_power_dbm=45, center_freq=1090e6, pulse_width_us=15.0, pulse_repetition_freq=2000.0)
-# jammer = Jammer(jamming_type="SWEEP", jamming_power_dbm=25, center_freq=1090e6, sweep_range_hz=1e6, sweep_time_us=100.0)
-# jammer = Jammer(jamming_type="DIRECTIONAL", jamming_power_dbm=45, center_freq=1090e6, position=gcs_pos, beam_width_deg=30.0, antenna_gain_dbi=15.0)
+# jammer = Jammer(jamming_type="CW", jamming_power_dbm=45, center_freq=1090e6, offset_freq=0.2e6, clock=clock, rng=jammer_rng)
+# jammer = Jammer(jamming_type="PULSE",jamming_power_dbm=45, center_freq=1090e6, pulse_width_us=15.0, pulse_repetition_freq=2000.0, clock=clock, rng=jammer_rng)
+# jammer = Jammer(jamming_type="SWEEP", jamming_power_dbm=25, center_freq=1090e6, sweep_range_hz=1e6, sweep_time_us=100.0, clock=clock, rng=jammer_rng)
+# jammer = Jammer(jamming_type="DIRECTIONAL", jamming_power_dbm=45, center_freq=1090e6, position=gcs_pos, beam_width_deg=30.0, antenna_gain_dbi=15.0, clock=clock, rng=jammer_rng)
 jammer = None
 
-spoofer = Spoofer(spoof_probability=0.7, fake_drone_id="")
+spoofer = Spoofer(spoof_probability=0.7, fake_drone_id="", rng=spoofer_rng)
 # spoofer = None
 
 
@@ -85,8 +96,11 @@ ax.set_ylabel("Longitude")
 ax.set_zlabel("Altitude (m)")
 ax.legend()
 
+drone_messages = {}
+
 def update(frame):
     active_drones = False
+    clock.advance(1)
     for drone in drones:
         status = drone.calculate_navigation(1)
 
@@ -100,21 +114,29 @@ def update(frame):
 
             
             # We now use actual ADS-B format for broadcasting
-            original_message = ADSBMessage(
-                drone.id, drone.current_position[2], drone.current_position[0], drone.current_position[1]
-            )
+            # (one message per drone, re-encoded incrementally as the drone moves)
+            original_message = drone_messages.get(drone.id)
+            if original_message is None:
+                original_message = ADSBMessage(
+                    drone.id, drone.current_position[2], drone.current_position[0], drone.current_position[1]
+                )
+                drone_messages[drone.id] = original_message
+            else:
+                original_message.update(
+                    altitude=drone.current_position[2], lat=drone.current_position[0], lon=drone.current_position[1]
+                )
             
             original_message_for_print = {
                 'drone_id': drone.id,
                 'latitude': drone.current_position[0],
                 'longitude': drone.current_position[1],
                 'altitude': drone.current_position[2],
-                'timestamp': time.time()
+                'timestamp': clock.time()
             }
             
 
             # Step 1: We now calculate distance before signal transmission... 
-            #         Since we're sending the encoded hexadecimal string, 
+            #         Since we're sending the encoded DF17 frame, 
             #         it's a waste to decode the message right after encoding to calculate the distance.
 
             distance = ADSBChannel._haversine_distance(
@@ -123,9 +145,8 @@ def update(frame):
 
 
             # Step 2: Simulate transmission from the drone to the GCS.
-            received_df17_even, received_df17_odd, delay_ns, corrupted, snr_db, _, _, _, _ = channel.transmit(
-                distance, original_message, jammer=jammer, spoofer=spoofer
-            )
+            result = channel.transmit(distance, original_message, jammer=jammer, spoofer=spoofer)
+            received_df17_even, received_df17_odd = result.even, result.odd
 
             if received_df17_even is None or received_df17_odd is None:
                 print(f"Drone {drone.id} message lost during transmission.")
@@ -137,16 +158,16 @@ def update(frame):
             #         This is a simulation of un-decodable df17 message.
             #         Note: Message will never be "corrupted" by the spoofer, since the spoofer re-calculates parity bits.
 
-            if corrupted:
+            if result.corrupted:
                 latitude = 0
                 longitude = 0
                 altitude = 0
             else:
-                latitude, longitude = pms.adsb.position(received_df17_even, received_df17_odd, time.time(), time.time()+1)
-                altitude = pms.adsb.altitude(received_df17_even)
+                latitude, longitude = adsb_decoder.airborne_position(received_df17_even, received_df17_odd)
+                altitude = adsb_decoder.altitude(received_df17_even)
 
             received_message = {
-                'drone_id': pms.adsb.icao(received_df17_even),
+                'drone_id': adsb_decoder.icao(received_df17_even),
                 'latitude': latitude,
                 'longitude': longitude,
                 'altitude': altitude
@@ -155,9 +176,9 @@ def update(frame):
             # Display Results
             print(f"Original Message: {original_message_for_print}")
             print(f"Received Message (after channel effects): {received_message}")
-            print(f"Transmission Delay: {delay_ns:.2f} ns")
-            print(f"SNR: {snr_db:.2f} dB")
-            print(f"Message Corrupted: {'Yes' if corrupted else 'No'}")
+            print(f"Transmission Delay: {result.delay_ns:.2f} ns")
+            print(f"SNR: {result.snr_db:.2f} dB")
+            print(f"Message Corrupted: {'Yes' if result.corrupted else 'No'}")
 
             # Step 4: Update GCS with the received message
             gcs.receive_update(
@@ -184,3 +205,7 @@ def update(frame):
 ani = FuncAnimation(fig, update, frames=range(100), interval=100, blit=False)
 
 plt.show()
+
+# The window is closed: trim the I/Q capture (if enabled above) and write its index
+if channel.recorder is not None:
+    channel.recorder.close()
@@ -1,4 +1,3 @@
-import time
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 from matplotlib.animation import FuncAnimation
@@ -6,6 +5,7 @@ from drone import Drone
 from route import RouteGenerator
 from gcs import GCS
 from channel import Channel
+from simclock import SimClock
 
 # Define central location (e.g., Washington, D.C.)
 center_lat, center_lon = 38.8977, -77.0365  # White House location
@@ -24,8 +24,9 @@ drones = [
     for i in range(len(routes))
 ]
 
-# Initialize the communication channel
-channel = Channel(delay_mean=0.1, delay_std=0.05, error_rate=0.01)
+# Initialize the communication channel (on simulation time, 1 animation frame = 1 second of flight)
+clock = SimClock()
+channel = Channel(delay_mean=0.1, delay_std=0.05, error_rate=0.01, clock=clock)
 
 # Create a figure for 3D plotting
 fig = plt.figure()
@@ -56,6 +57,7 @@ ax.legend()
 
 def update(frame):
     active_drones = False
+    clock.advance(1)
     for drone in drones:
         status = drone.calculate_navigation(1)
 
@@ -71,7 +73,7 @@ def update(frame):
                 'latitude': drone.current_position[0],
                 'longitude': drone.current_position[1],
                 'altitude': drone.current_position[2],
-                'timestamp': time.time()
+                'timestamp': clock.time()
             }
 
             # Transmit message through the channel
@@ -1,4 +1,3 @@
-import time
 import numpy as np
 import matplotlib.pyplot as plt
 import os
@@ -9,13 +8,24 @@ from route import RouteGenerator
 from gcs import GCS
 from adsbchannel import ADSBChannel
 from adsbmessage import ADSBMessage
-import pyModeS as pms
+import adsb_message_decoder as adsb_decoder
 
 from jammer import Jammer
 from spoofer import Spoofer
+from simclock import SimClock
+from seeding import spawn_rngs
 import seaborn as sns
 
 
+# Master seed: every component gets its own random stream spawned from it.
+# Set an int to make the whole run reproducible.
+SEED = None
+seed_sequence = np.random.SeedSequence(SEED)
+
+# Receiver-side CRC error correction (bits repaired per frame: 0 = off, 1 or 2 like dump1090)
+ERROR_CORRECTION = 0
+
+
 # Define central location (e.g., Washington, D.C.)
 center_lat, center_lon = 38.8977, -77.0365  # White House location
 
@@ -26,7 +36,7 @@ jammer_pos = (38.7600, -77.1000) # This is about 1km southwest form GCS position
 
 
 # Create a RouteGenerator instancz
-route_gen = RouteGenerator(center_lat, center_lon, num_routes=3, waypoints_per_route=5, max_offset=0.02)
+route_gen = RouteGenerator(center_lat, center_lon, num_routes=3, waypoints_per_route=5, max_offset=0.02, rng=spawn_rngs(seed_sequence, 1)[0])
 routes = route_gen.generate_routes()
 
 # Function to initialize drones
@@ -177,9 +187,12 @@ def plot_packet_loss_data(results, colors=None, output_path='results/packet_loss
 
 # Function to run a simulation scenario
 def run_simulation(jamming=False, spoofing=False, spoof_probability=0.3):
-    channel = ADSBChannel()
-    jammer = Jammer(jamming_type="PULSE",jamming_power_dbm=45, center_freq=1090e6, pulse_width_us=15.0, pulse_repetition_freq=2000.0)
-    spoofer = Spoofer(spoof_probability=spoof_probability, fake_drone_id="FAKE-DRONE")
+    # Everything runs on simulation time, so latency/throughput don't depend on the host machine
+    clock = SimClock()
+    channel_rng, jammer_rng, spoofer_rng = spawn_rngs(seed_sequence, 3)
+    channel = ADSBChannel(clock=clock, rng=channel_rng, error_correction=ERROR_CORRECTION)
+    jammer = Jammer(jamming_type="PULSE",jamming_power_dbm=45, center_freq=1090e6, pulse_width_us=15.0, pulse_repetition_freq=2000.0, clock=clock, rng=jammer_rng)
+    spoofer = Spoofer(spoof_probability=spoof_probability, fake_drone_id="FAKE-DRONE", rng=spoofer_rng)
 
     if not jamming:
         jammer = None 
@@ -190,20 +203,24 @@ def run_simulation(jamming=False, spoofing=False, spoof_probability=0.3):
 
     total_messages = 0
     lost_messages = 0
+    corrected_messages = 0
     packet_loss_over_time = []
     snr_values = []
     latency_values = []
     throughput_values = []
 
-    start_time = time.time()
+    start_time = clock.time()
 
     for drone in drones:
+        original_adsb_message = None
+
         while True:
             status = drone.calculate_navigation(1)
             if status in [-1, -2, 0]:
                 break
+            clock.advance(1)  # the drone has flown for 1 second
 
-            send_time = time.time()
+            send_time = clock.time()
 
             # original_message = {
             #     'drone_id': drone.id,
@@ -214,28 +231,32 @@ def run_simulation(jamming=False, spoofing=False, spoof_probability=0.3):
             # }
 
             distance = ADSBChannel._haversine_distance(drone.current_position[0], drone.current_position[1], gcs_pos[0], gcs_pos[1])
-            original_adsb_message = ADSBMessage(drone.id, drone.current_position[2], drone.current_position[0], drone.current_position[1])
+            if original_adsb_message is None:
+                original_adsb_message = ADSBMessage(drone.id, drone.current_position[2], drone.current_position[0], drone.current_position[1])
+            else:
+                original_adsb_message.update(altitude=drone.current_position[2], lat=drone.current_position[0], lon=drone.current_position[1])
 
-            received_df17_even, received_df17_odd, delay_ns, corrupted, snr_db, spoofed, jammed, _, _ = channel.transmit(
-                distance, original_adsb_message, jammer=jammer, spoofer=spoofer
-            )
+            result = channel.transmit(distance, original_adsb_message, jammer=jammer, spoofer=spoofer)
 
-            receive_time = time.time()
+            receive_time = clock.time()
             
             total_messages += 1
 
-            if corrupted:
+            if result.corrupted:
                 lost_messages += 1
                 packet_loss_over_time.append((total_messages, lost_messages / total_messages * 100))
-                snr_values.append((total_messages, snr_db))
+                snr_values.append((total_messages, result.snr_db))
                 continue
                 
             else:
-                latitude, longitude = pms.adsb.position(received_df17_even, received_df17_odd, time.time(), time.time()+1)
-                altitude = pms.adsb.altitude(received_df17_even)
+                if result.corrected:
+                    corrected_messages += 1
+
+                latitude, longitude = adsb_decoder.airborne_position(result.even, result.odd)
+                altitude = adsb_decoder.altitude(result.even)
 
                 received_message = {
-                    'drone_id': pms.adsb.icao(received_df17_even),
+                    'drone_id': adsb_decoder.icao(result.even),
                     'latitude': latitude,
                     'longitude': longitude,
                     'altitude': altitude
@@ -250,7 +271,7 @@ def run_simulation(jamming=False, spoofing=False, spoof_probability=0.3):
                     )
                 )
                 packet_loss_over_time.append((total_messages, lost_messages / total_messages * 100))
-                snr_values.append((total_messages, snr_db))
+                snr_values.append((total_messages, result.snr_db))
 
                 # Calculate latency in milliseconds
                 latency = (receive_time - send_time) * 1000
@@ -261,27 +282,29 @@ def run_simulation(jamming=False, spoofing=False, spoof_probability=0.3):
                 throughput = total_messages / elapsed_time
                 throughput_values.append((elapsed_time, throughput))
 
-    return packet_loss_over_time, snr_values, latency_values, throughput_values
+    return packet_loss_over_time, snr_values, latency_values, throughput_values, (corrected_messages, total_messages)
 
 
 # Function to run a simulation scenario
 def run_simulation_jammer():
     jammer_data = {}
 
-    channel = ADSBChannel()
+    clock = SimClock()
+    rngs = spawn_rngs(seed_sequence, 6)
+    channel = ADSBChannel(clock=clock, rng=rngs[0])
         
-    jammer_route_gen = RouteGenerator(center_lat, center_lon, num_routes=1, waypoints_per_route=2, max_offset=0.02)
+    jammer_route_gen = RouteGenerator(center_lat, center_lon, num_routes=1, waypoints_per_route=2, max_offset=0.02, rng=rngs[1])
     jammer_routes = jammer_route_gen.generate_routes()
 
 
     
 
     jammers = [
-        Jammer(jamming_type="CW"   , jamming_power_dbm=45, center_freq=1090e6, offset_freq=0.2e6),
-        Jammer(jamming_type="PULSE", jamming_power_dbm=45, center_freq=1090e6, pulse_width_us=15.0, pulse_repetition_freq=40000.0),
-        Jammer(jamming_type="SWEEP", jamming_power_dbm=45, center_freq=1090e6, sweep_range_hz=1e6, sweep_time_us=100.0),
+        Jammer(jamming_type="CW"   , jamming_power_dbm=45, center_freq=1090e6, offset_freq=0.2e6, clock=clock, rng=rngs[2]),
+        Jammer(jamming_type="PULSE", jamming_power_dbm=45, center_freq=1090e6, pulse_width_us=15.0, pulse_repetition_freq=40000.0, clock=clock, rng=rngs[3]),
+        Jammer(jamming_type="SWEEP", jamming_power_dbm=45, center_freq=1090e6, sweep_range_hz=1e6, sweep_time_us=100.0, clock=clock, rng=rngs[4]),
         Jammer(jamming_type="DIRECTIONAL", jamming_power_dbm=45, center_freq=1090e6 + 10e3, 
-            gcs_position=gcs_pos, position=jammer_pos, beam_width_deg=20.0, antenna_gain_dbi=10.0)
+            gcs_position=gcs_pos, position=jammer_pos, beam_width_deg=20.0, antenna_gain_dbi=10.0, clock=clock, rng=rngs[5])
     ]
     # For Directional Jammer, I added 10kHz intensionally for graph to be distinguishable
 
@@ -302,19 +325,24 @@ def run_simulation_jammer():
         )
 
         jammer_data[jammer.jamming_type] = {}
+        original_adsb_message = None
 
         while True:
 
             status = drone.calculate_navigation(1)
             if status in [-1, -2, 0]:
                 break
+            clock.advance(1)
 
             distance = ADSBChannel._haversine_distance(drone.current_position[0], drone.current_position[1], gcs_pos[0], gcs_pos[1])
-            original_adsb_message = ADSBMessage(drone.id, drone.current_position[2], drone.current_position[0], drone.current_position[1])
+            if original_adsb_message is None:
+                original_adsb_message = ADSBMessage(drone.id, drone.current_position[2], drone.current_position[0], drone.current_position[1])
+            else:
+                original_adsb_message.update(altitude=drone.current_position[2], lat=drone.current_position[0], lon=drone.current_position[1])
 
-            _, _, _, _, _, _, _, bit_power_jammer_data, bit_frequency_jammer_data = channel.transmit(
-                distance, original_adsb_message, jammer=jammer, spoofer=None
-            )
+            result = channel.transmit(distance, original_adsb_message, jammer=jammer, spoofer=None, bit_stats=True)
+            bit_power_jammer_data = result.bit_power_jammer
+            bit_frequency_jammer_data = result.bit_frequency_jammer
 
         jammer_data[jammer.jamming_type]['bit_power'] = bit_power_jammer_data
         jammer_data[jammer.jamming_type]['bit_frequency'] = bit_frequency_jammer_data
@@ -333,13 +361,16 @@ else:
     results = {}
     for scenario, params in scenarios.items():
         print(f"Running scenario: {scenario}")
-        packet_loss_data, snr_data, latency_data, throughput_data = run_simulation(**params)
+        packet_loss_data, snr_data, latency_data, throughput_data, (corrected, total) = run_simulation(**params)
         results[scenario] = {
             'packet_loss': packet_loss_data,
             'snr': snr_data,
             'latency': latency_data,
-            'throughput': throughput_data
+            'throughput': throughput_data,
+            'corrected': corrected
         }
+        if ERROR_CORRECTION:
+            print(f"  {corrected} of {total} messages received only after CRC error correction")
 
     print(f"Running jammer simulation...")
     jammer_data = run_simulation_jammer()
@@ -0,0 +1,51 @@
+import math
+import sys
+
+import numpy
+
+from adsb_message_encoder import nl, nl_batch, nl_formula, NL_TRANSITIONS
+
+SWEEP_POINTS = 2000001   # evenly spaced latitudes over [-90, 90]
+NEIGHBOURHOOD = 16       # floats checked on each side of every transition
+
+
+def transition_neighbourhood(transition):
+	# The NEIGHBOURHOOD floats below and above a transition latitude (and the transition itself)
+	below = [transition]
+	above = []
+	lat = transition
+	for _ in range(NEIGHBOURHOOD):
+		lat = math.nextafter(lat, -math.inf)
+		below.append(lat)
+	lat = transition
+	for _ in range(NEIGHBOURHOOD):
+		lat = math.nextafter(lat, math.inf)
+		above.append(lat)
+	return below + above
+
+
+def check(latitudes):
+	# Latitudes where nl() or nl_batch() disagree with the closed-form nl_formula()
+	expected = [nl_formula(lat) for lat in latitudes]
+	batch = nl_batch(numpy.array(latitudes, dtype=numpy.float64)).tolist()
+	return [lat for lat, want, got in zip(latitudes, expected, batch) if nl(lat) != want or got != want]
+
+
+def main():
+	sweep = numpy.linspace(-90.0, 90.0, SWEEP_POINTS).tolist()
+	edges = []
+	for transition in NL_TRANSITIONS:
+		for lat in transition_neighbourhood(transition):
+			edges += [lat, -lat]
+
+	failed = False
+	for name, latitudes in (('sweep', sweep), ('transitions', edges)):
+		mismatches = check(latitudes)
+		print(f"{name}: {len(latitudes)} latitudes, {len(mismatches)} mismatches")
+		if mismatches:
+			print("  e.g.", mismatches[:10])
+			failed = True
+
+	sys.exit(1 if failed else 0)
+
+main()
@@ -0,0 +1,159 @@
+# Sample-level PHY model for 1090 MHz ADS-B
+#
+# The default ADSBChannel models jamming as a per-bit error probability on the frame.
+# This module actually "transceives" the signal instead:
+#   frames -> PPM chips (frame_1090es_ppm_modulate_batch) -> complex baseband
+#          -> + AWGN + sampled jammer waveform -> preamble detector -> PPM slicer -> frames
+#
+# Everything works on (N, 2, 14) frame buffers, i.e. many messages per NumPy call.
+# One sample per PPM chip, so 2 samples per microsecond. Powers are in dBm, amplitudes in sqrt(mW).
+
+import numpy as np
+
+from jammer import jammer_list
+from adsb_message_encoder import frame_1090es_ppm_modulate_batch, PPM_PREAMBLE, PPM_EVEN_OFFSET, PPM_ODD_OFFSET, PPM_FRAME_BYTES
+
+
+SAMPLES_PER_US = 2
+PPM_SAMPLES = PPM_FRAME_BYTES * 8
+PREAMBLE_SAMPLES = (PPM_EVEN_OFFSET * 8, PPM_ODD_OFFSET * 8)   # nominal start of the even / odd preamble
+PREAMBLE_CHIPS = np.unpackbits(np.array(PPM_PREAMBLE, dtype=np.uint8))
+DATA_OFFSET = len(PREAMBLE_CHIPS)                              # data starts right after the 8 us preamble
+FRAME_BITS = 112
+
+PREAMBLE_SEARCH = 4        # +/- samples searched around the nominal preamble position
+PREAMBLE_THRESHOLD = 2.0   # pulse/quiet mean magnitude ratio needed to accept a preamble
+
+# Time of every sample, in us from the start of the even preamble (same origin as ADSBMessage.get_bit_timing)
+SAMPLE_TIME_US = (np.arange(PPM_SAMPLES) - PREAMBLE_SAMPLES[0]) / SAMPLES_PER_US
+
+_default_rng = np.random.default_rng()
+
+
+def dbm_to_mw(dbm):
+    return 10.0 ** (np.asarray(dbm, dtype=np.float64) / 10.0)
+
+
+def mw_to_dbm(mw):
+    with np.errstate(divide='ignore'):
+        return 10.0 * np.log10(mw)
+
+
+def modulate(frames, rx_power_dbm, rng=None):
+    # (N, 2, 14) frames -> (N, PPM_SAMPLES) complex baseband at the receiver, random carrier phase per message
+    rng = rng or _default_rng
+    chips = np.unpackbits(frame_1090es_ppm_modulate_batch(frames), axis=1)
+    n = chips.shape[0]
+
+    amplitude = np.sqrt(dbm_to_mw(rx_power_dbm)).reshape(-1, 1)
+    phase = rng.uniform(0.0, 2 * np.pi, (n, 1))
+    return chips * (amplitude * np.exp(1j * phase)).astype(np.complex64)
+
+
+def awgn(shape, noise_power_dbm, rng=None):
+    # Complex white Gaussian noise, drawn as float32 (I, Q) pairs in one call
+    rng = rng or _default_rng
+    sigma = np.sqrt(dbm_to_mw(noise_power_dbm) / 2.0).astype(np.float32)
+    if np.ndim(sigma) > 0:
+        sigma = sigma.reshape(-1, 1)
+    noise = rng.standard_normal(tuple(shape) + (2,), dtype=np.float32).view(np.complex64)[..., 0]
+    return noise * sigma
+
+
+def jammer_waveform(jammer, n, rng=None, target_lat=None, target_lon=None, start_time=None):
+    """
+    Sampled jammer signal at the receiver for n messages, (n, PPM_SAMPLES) complex.
+    As in the bit-level model, the jammer power is taken as received power (no path loss).
+    The power / frequency of every sample come from the jammer itself (Jammer.sampled_profile()):
+    a carrier at that frequency for tone jammers (CW, SWEEP), noise of that power otherwise (PULSE, DIRECTIONAL).
+    target_lat / target_lon: optional n receiver positions for the DIRECTIONAL beam, its GCS if None.
+    start_time: simulation time (s) the messages reach the receiver, scalar or n (the jammer's clock if None).
+    """
+    rng = rng or _default_rng
+    shape = (n, PPM_SAMPLES)
+    if target_lat is not None and target_lon is not None:
+        target_lat, target_lon = np.broadcast_to(target_lat, (n,)), np.broadcast_to(target_lon, (n,))
+
+    if start_time is not None and np.ndim(start_time) > 0:
+        start_time = np.broadcast_to(start_time, (n,))
+
+    power_dbm, frequency = jammer.sampled_profile(SAMPLE_TIME_US, start_time, target_lat, target_lon)
+    amplitude = np.sqrt(dbm_to_mw(power_dbm))   # 0 where the jammer has no effect
+
+    if jammer.tone:
+        # Carrier following the jammer frequency (a chirp for SWEEP), random phase per message
+        freq_difference = np.where(np.isfinite(frequency), frequency - 1090e6, 0.0)
+        phase = 2 * np.pi * np.cumsum(freq_difference, axis=-1) * (1e-6 / SAMPLES_PER_US)
+        phase0 = rng.uniform(0.0, 2 * np.pi, (n, 1))
+        return np.broadcast_to(amplitude * np.exp(1j * (phase + phase0)), shape).astype(np.complex64)
+
+    # Noise bursts / beam-weighted noise
+    return (awgn(shape, 0.0, rng) * amplitude).astype(np.complex64)
+
+
+def detect_preamble(mag, nominal, search=PREAMBLE_SEARCH, threshold=PREAMBLE_THRESHOLD):
+    """
+    Find the preamble of every row of mag (N, S) within +/- search samples of nominal.
+    Returns (found (N,) bool, start (N,) int).
+    """
+    pulses = np.nonzero(PREAMBLE_CHIPS)[0]
+    quiet = np.nonzero(PREAMBLE_CHIPS == 0)[0]
+    offsets = np.arange(-search, search + 1)
+
+    starts = nominal + offsets                                   # (K,)
+    pulse_mean = mag[:, starts[:, None] + pulses].mean(axis=2)   # (N, K)
+    quiet_mean = mag[:, starts[:, None] + quiet].mean(axis=2)
+
+    best = np.argmax(pulse_mean - quiet_mean, axis=1)
+    rows = np.arange(mag.shape[0])
+    found = pulse_mean[rows, best] > threshold * quiet_mean[rows, best]
+    return found, starts[best]
+
+
+def slice_bits(mag, start):
+    # PPM slicer: a bit is 1 when the first half-chip is stronger than the second
+    first = start[:, None] + DATA_OFFSET + 2 * np.arange(FRAME_BITS)
+    bits = np.take_along_axis(mag, first, axis=1) > np.take_along_axis(mag, first + 1, axis=1)
+    return np.packbits(bits, axis=1)
+
+
+def demodulate(signal):
+    """
+    (N, PPM_SAMPLES) complex -> ((N, 2, 14) uint8 frames, (N, 2) bool preamble found)
+    """
+    mag = np.abs(signal)
+    n = mag.shape[0]
+
+    frames = np.empty((n, 2, 14), dtype=np.uint8)
+    found = np.empty((n, 2), dtype=bool)
+    for i, nominal in enumerate(PREAMBLE_SAMPLES):
+        found[:, i], start = detect_preamble(mag, nominal)
+        frames[:, i] = slice_bits(mag, start)
+    return frames, found
+
+
+def transceive(frames, rx_power_dbm, noise_power_dbm, jammer=None, rng=None, target_lat=None, target_lon=None, start_time=None):
+    """
+    Send N even/odd frame pairs through the sampled channel.
+    :param frames: (N, 2, 14) uint8
+    :param rx_power_dbm: received signal power, scalar or (N,)
+    :param noise_power_dbm: thermal noise + noise figure, scalar or (N,)
+    :param jammer: optional Jammer or list of Jammers, their waveforms are added to every message
+                   (each drawn from its jammer's own rng, so the powers add up)
+    :param target_lat, target_lon: optional (N,) receiver positions, for the DIRECTIONAL jammer's beam
+    :param start_time: optional arrival time(s) in seconds on the jammers' clock, scalar or (N,), for the
+                       PULSE / SWEEP phase of every message (the jammer's clock.time() if None)
+    Returns (received frames (N, 2, 14), preamble found (N, 2), interference power over the message in dBm (N,))
+    """
+    rng = rng or _default_rng
+    frames = np.asarray(frames, dtype=np.uint8).reshape(-1, 2, 14)
+    n = frames.shape[0]
+
+    signal = modulate(frames, rx_power_dbm, rng)
+    interference = awgn(signal.shape, noise_power_dbm, rng)
+    for emitter in jammer_list(jammer):
+        interference += jammer_waveform(emitter, n, emitter.rng, target_lat, target_lon, start_time)
+
+    received, found = demodulate(signal + interference)
+    interference_dbm = mw_to_dbm(np.mean(np.abs(interference) ** 2, axis=1))
+    return received, found, interference_dbm
@@ -0,0 +1,171 @@
+# Network of ground receivers (GCS)
+#
+# Every transmission is delivered to each GCS within range of the drone. The receivers are
+# kept in a uniform grid over a local ENU (east/north) projection, with cells at least as large as
+# the receiver range (wider east-west away from the reference latitude), so the candidates of a drone are the receivers in its own and the 8
+# neighbouring cells. Longitudes are taken relative to the reference and the east cells wrap around the globe,
+# so networks spanning the antimeridian are handled. The cost grows with the number of nearby drone/receiver pairs instead of
+# drones x receivers.
+#
+# Delay, SNR, jamming, corruption and (given transmit times) collisions of each delivery
+# come from ADSBChannel.transmit_batch().
+#
+# Usage:
+#   network = ReceiverNetwork([GCS(38.90, -77.04), GCS(38.83, -77.31)], channel, max_range_m=30e3)
+#   receptions = network.transmit_batch(frames, lat, lon, jammer=jammer)
+#   network.deliver(receptions)
+
+import math
+import numpy as np
+
+from adsbchannel import ADSBChannel, TRANSMIT_DTYPE
+
+
+EARTH_RADIUS = 6371000.0  # meters, same as ADSBChannel._haversine_distance
+
+# One row per (drone, receiver) delivery: indices into the transmitted batch and the receiver list,
+# the drone-receiver distance and the ADSBChannel.transmit_batch() result of that link.
+RECEPTION_DTYPE = np.dtype(
+    [('drone', np.int64), ('receiver', np.int64), ('distance', np.float64)] + TRANSMIT_DTYPE.descr
+)
+
+_CELL_BITS = 31
+_CELL_OFFSET = 1 << (_CELL_BITS - 1)
+
+
+def enu_projection(lat, lon, ref_lat, ref_lon):
+    # Local east/north coordinates in meters around (ref_lat, ref_lon), equirectangular approximation.
+    # The longitude difference is wrapped into [-180, 180), east is within half a circumference of the reference
+    dlon = (np.asarray(lon, dtype=np.float64) - ref_lon + 180.0) % 360.0 - 180.0
+    east = EARTH_RADIUS * np.radians(dlon) * math.cos(math.radians(ref_lat))
+    north = EARTH_RADIUS * np.radians(np.asarray(lat, dtype=np.float64) - ref_lat)
+    return east, north
+
+
+def _cell_key(ix, iy):
+    return ((ix + _CELL_OFFSET) << _CELL_BITS) | (iy + _CELL_OFFSET)
+
+
+class ReceiverNetwork:
+    def __init__(self, stations, channel=None, max_range_m=50e3, reference=None):
+        """
+        :param stations: List of GCS.
+        :param channel: ADSBChannel used for the link model of every drone-receiver pair.
+        :param max_range_m: Receivers farther than this from a drone don't get its messages.
+        :param reference: (lat, lon) origin of the ENU projection, the mean receiver position if None.
+        """
+        self.stations = list(stations)
+        self.channel = channel or ADSBChannel()
+        self.max_range_m = float(max_range_m)
+
+        self.lat = np.array([gcs.position[0] for gcs in self.stations], dtype=np.float64)
+        self.lon = np.array([gcs.position[1] for gcs in self.stations], dtype=np.float64)
+
+        if reference is None:
+            reference = (float(self.lat.mean()), float(self.lon.mean())) if self.stations else (0.0, 0.0)
+        self.reference = reference
+
+        # Grid cell size in projected meters. North distances are exact, but the projection scales east
+        # distances by cos(reference latitude), not by the cos(latitude) of the pair. Size the east cells for
+        # the widest longitude span max_range_m can cover at the most poleward latitude a pair can reach
+        # (haversine: hav(dlon) <= hav(d / R) / (cos(lat1) cos(lat2))), so the 3x3 search never misses one.
+        max_abs_lat = float(np.abs(self.lat).max()) if self.stations else abs(reference[0])
+        cos_min = math.cos(math.radians(min(90.0, max_abs_lat + math.degrees(self.max_range_m / EARTH_RADIUS))))
+        sin_half = math.sin(self.max_range_m / (2 * EARTH_RADIUS))
+        max_dlon = math.pi if sin_half >= cos_min else 2 * math.asin(sin_half / cos_min)
+        self._cell_north_m = self.max_range_m
+        cell_east_m = max(self.max_range_m, EARTH_RADIUS * max_dlon * math.cos(math.radians(reference[0])))
+
+        # East cells wrap around the globe: a whole number of columns (each at least cell_east_m wide) spans
+        # the projected circumference and columns are taken modulo that number, so cells on both sides of
+        # the antimeridian (east = +-half a circumference) are neighbours
+        circumference = 2 * math.pi * EARTH_RADIUS * math.cos(math.radians(reference[0]))
+        self._columns = max(1, int(circumference // cell_east_m))
+        self._cell_east_m = max(cell_east_m, circumference / self._columns)
+
+        # Grid index: receivers sorted by cell key, so the receivers of a cell are one contiguous slice
+        east, north = enu_projection(self.lat, self.lon, *self.reference)
+        keys = _cell_key(*self._cells(east, north))
+        self._order = np.argsort(keys, kind='stable')
+        self._keys = keys[self._order]
+
+    def _cells(self, east, north):
+        return (np.floor(east / self._cell_east_m).astype(np.int64) % self._columns,
+                np.floor(north / self._cell_north_m).astype(np.int64))
+
+    def candidate_pairs(self, lat, lon):
+        """
+        (drone index, receiver index) of every receiver in the 3x3 grid cells around each drone.
+        A superset of the pairs within max_range_m.
+        """
+        east, north = enu_projection(np.atleast_1d(lat), np.atleast_1d(lon), *self.reference)
+        ix, iy = self._cells(east, north)
+
+        drones = []
+        receivers = []
+        # With fewer than 3 columns the east neighbours overlap, visit each column once
+        for dx in sorted({dx % self._columns for dx in (-1, 0, 1)}):
+            for dy in (-1, 0, 1):
+                keys = _cell_key((ix + dx) % self._columns, iy + dy)
+                start = np.searchsorted(self._keys, keys, side='left')
+                count = np.searchsorted(self._keys, keys, side='right') - start
+
+                # Expand the [start, start + count) slices without a Python loop
+                drone = np.repeat(np.arange(ix.shape[0]), count)
+                first = np.repeat(start - np.cumsum(count) + count, count)
+                drones.append(drone)
+                receivers.append(self._order[first + np.arange(drone.shape[0])])
+
+        return np.concatenate(drones), np.concatenate(receivers)
+
+    def pairs_in_range(self, lat, lon):
+        """(drone index, receiver index, distance) of every drone-receiver pair within max_range_m."""
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+
+        drone, receiver = self.candidate_pairs(lat, lon)
+        distance = ADSBChannel._haversine_distance(lat[drone], lon[drone], self.lat[receiver], self.lon[receiver])
+        in_range = distance <= self.max_range_m
+        return drone[in_range], receiver[in_range], distance[in_range]
+
+    def receivers_in_range(self, lat, lon):
+        """Indices of the receivers that hear a drone at (lat, lon)."""
+        _, receiver, _ = self.pairs_in_range(lat, lon)
+        return np.sort(receiver)
+
+    def transmit_batch(self, frames, lat, lon, tx_power_dbm=50, bandwidth_hz=1e6, jammer=None, tx_time=None):
+        """
+        Deliver N frame pairs, transmitted from (lat, lon), to every receiver in range.
+        :param frames: (N, 2, 14) uint8 even/odd frames.
+        :param lat, lon: N drone positions.
+        :param tx_power_dbm: Transmit power, scalar or N.
+        :param tx_time: Optional N transmit times (seconds), enables the collision model at every receiver.
+        Returns a RECEPTION_DTYPE structured array, one row per delivery.
+        """
+        frames = np.asarray(frames, dtype=np.uint8).reshape(-1, 2, 14)
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+
+        drone, receiver, distance = self.pairs_in_range(lat, lon)
+
+        tx_power_dbm = np.broadcast_to(np.asarray(tx_power_dbm, dtype=np.float64), lat.shape)[drone]
+        result = self.channel.transmit_batch(
+            distance, frames[drone], tx_power_dbm=tx_power_dbm, bandwidth_hz=bandwidth_hz, jammer=jammer,
+            receiver_lat=self.lat[receiver], receiver_lon=self.lon[receiver],
+            tx_time=None if tx_time is None else np.broadcast_to(np.asarray(tx_time, dtype=np.float64), lat.shape)[drone],
+            receiver=receiver
+        )
+
+        receptions = np.empty(drone.shape[0], dtype=RECEPTION_DTYPE)
+        receptions['drone'] = drone
+        receptions['receiver'] = receiver
+        receptions['distance'] = distance
+        for name in TRANSMIT_DTYPE.names:
+            receptions[name] = result[name]
+        return receptions
+
+    def deliver(self, receptions):
+        """Hand the uncorrupted receptions to their GCS (GCS.receive_frames)."""
+        ok = receptions[~receptions['corrupted']]
+        for index in np.unique(ok['receiver']):
+            self.stations[index].receive_frames(ok['frames'][ok['receiver'] == index])
@@ -1,7 +1,7 @@
-import random
+from seeding import default_rng
 
 class RouteGenerator:
-    def __init__(self, center_lat, center_lon, num_routes=3, waypoints_per_route=5, max_offset=0.01):
+    def __init__(self, center_lat, center_lon, num_routes=3, waypoints_per_route=5, max_offset=0.01, rng=None):
         """
         Generate random routes around a centralized point.
 
@@ -10,12 +10,14 @@ class RouteGenerator:
         :param num_routes: Number of different routes to generate.
         :param waypoints_per_route: Number of waypoints per route.
         :param max_offset: Maximum latitude/longitude variation (~0.01 = ~1km).
+        :param rng: numpy Generator (see seeding.py), freshly seeded if None.
         """
         self.center_lat = center_lat
         self.center_lon = center_lon
         self.num_routes = num_routes
         self.waypoints_per_route = waypoints_per_route
         self.max_offset = max_offset
+        self.rng = default_rng(rng)
 
     def generate_routes(self):
         """
@@ -26,12 +28,14 @@ class RouteGenerator:
         routes = []
         for _ in range(self.num_routes):
             route = []
-            base_altitude = random.randint(80, 150)  # Base altitude between 80m-150m
+            base_altitude = int(self.rng.integers(80, 150, endpoint=True))  # Base altitude between 80m-150m
 
-            for _ in range(self.waypoints_per_route):
-                lat_offset = random.uniform(-self.max_offset, self.max_offset)
-                lon_offset = random.uniform(-self.max_offset, self.max_offset)
-                altitude = base_altitude + random.randint(0, 50)  # Altitude variation up to 50m
+            # Offsets and altitude variations of all waypoints in one draw
+            offsets = self.rng.uniform(-self.max_offset, self.max_offset, (self.waypoints_per_route, 2)).tolist()
+            variations = self.rng.integers(0, 50, self.waypoints_per_route, endpoint=True).tolist()  # Altitude variation up to 50m
+
+            for (lat_offset, lon_offset), variation in zip(offsets, variations):
+                altitude = base_altitude + variation
                 
                 lat = self.center_lat + lat_offset
                 lon = self.center_lon + lon_offset
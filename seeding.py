@@ -0,0 +1,48 @@
+# Random number streams
+#
+# Every randomized component (ADSBChannel, Jammer, Spoofer, RouteGenerator) takes its own
+# numpy.random.Generator (rng=...). Spawning them from one master seed makes a run reproducible,
+# and since the streams are independent, components can be run in parallel without sharing state.
+#
+# Usage:
+#   channel_rng, jammer_rng = spawn_rngs(587, 2)
+#   channel = ADSBChannel(rng=channel_rng)
+#   jammer = Jammer("CW", 45, rng=jammer_rng)
+
+import numpy as np
+
+
+def spawn_rngs(seed, n):
+    """
+    n independent Generators derived from a master seed.
+    :param seed: int, None (fresh OS entropy) or a SeedSequence; spawning again from the same
+                 SeedSequence gives new streams, so one master can feed several runs.
+    """
+    seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    return [np.random.default_rng(child) for child in seed_sequence.spawn(n)]
+
+
+def default_rng(rng=None):
+    # The given Generator, or a freshly seeded one
+    return rng if rng is not None else np.random.default_rng()
+
+
+class RandomBlocks:
+    """
+    Scalar uniform draws for per-message code paths, taken from a Generator block_size at a time
+    instead of one Generator call each.
+    """
+
+    def __init__(self, rng, block_size=4096):
+        self.rng = rng
+        self.block_size = block_size
+        self._block = []
+
+    def random(self):
+        if not self._block:
+            # reversed, so pop() hands them out in draw order
+            self._block = self.rng.random(self.block_size)[::-1].tolist()
+        return self._block.pop()
+
+    def uniform(self, low, high):
+        return low + (high - low) * self.random()
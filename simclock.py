@@ -0,0 +1,71 @@
+import heapq
+import itertools
+import time
+
+
+class WallClock:
+    """Real time clock, same behavior as calling time.time() / time.sleep() directly."""
+
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class SimClock:
+    """
+    Virtual-time discrete-event clock.
+    Shared by the channels, jammers and scenario loops: delays advance the simulation time
+    instead of sleeping, so a run is as fast as the CPU allows and its latency numbers are deterministic.
+    """
+
+    def __init__(self, start_time=0.0):
+        """
+        :param start_time: Simulation time (seconds) at creation.
+        """
+        self.now = float(start_time)
+        self._events = []
+        self._counter = itertools.count()  # keeps events with the same time in scheduling order
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        """Advance the clock by the given delay, firing any events that fall inside it."""
+        self.run_until(self.now + max(0.0, float(seconds)))
+
+    def advance(self, seconds):
+        self.sleep(seconds)
+
+    def schedule(self, delay, callback, *args):
+        """
+        Call callback(*args) once the clock reaches now + delay.
+        :return: The absolute simulation time of the event.
+        """
+        event_time = self.now + max(0.0, float(delay))
+        heapq.heappush(self._events, (event_time, next(self._counter), callback, args))
+        return event_time
+
+    def run_until(self, end_time):
+        """Fire the pending events up to end_time in time order, then set the clock to end_time."""
+        while self._events and self._events[0][0] <= end_time:
+            event_time, _, callback, args = heapq.heappop(self._events)
+            self.now = max(self.now, event_time)
+            callback(*args)
+        self.now = max(self.now, float(end_time))
+
+    def step(self):
+        """Fire the earliest pending event(s) and advance the clock to them. False if nothing is pending."""
+        if not self._events:
+            return False
+        self.run_until(self._events[0][0])
+        return True
+
+    def run(self):
+        """Fire all pending events (including ones scheduled while running)."""
+        while self._events:
+            self.run_until(self._events[0][0])
+
+    def pending(self):
+        return len(self._events)
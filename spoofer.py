@@ -1,8 +1,7 @@
-import random
 import numpy as np
-import time
-import pyModeS as pms
+import adsb_message_decoder as adsb_decoder
 from adsbmessage import ADSBMessage
+from seeding import default_rng, RandomBlocks
 from util import *
 
 class Spoofer:
@@ -11,10 +10,14 @@ class Spoofer:
     or injecting entirely fake drones into the system.
     """
 
-    def __init__(self, spoof_probability=0.3, fake_drone_id=""):
+    def __init__(self, spoof_probability=0.3, fake_drone_id="", rng=None):
         self.spoof_probability = spoof_probability
         self.fake_drone_id = fake_drone_id
 
+        # Random stream of this spoofer (numpy Generator, see seeding.py)
+        self.rng = default_rng(rng)
+        self._uniform = RandomBlocks(self.rng)
+
         self.delta = {'latitude': 0, 'longitude': 0, 'altitude': 0}
 
         # Gradual acceleration starts small and increases over time
@@ -27,13 +30,16 @@ class Spoofer:
         self.prev_message = None
         self.count = 0
 
+        # Re-used ADSBMessage per drone, so a new spoofed position only patches the changed fields
+        self.spoofed_messages = {}
+
     def spoof_message(self, df17_even, df17_odd):        
-        if random.random() < self.spoof_probability:
-            latitude, longitude = pms.adsb.position(df17_even, df17_odd, time.time(), time.time()+1)
-            altitude = pms.adsb.altitude(df17_even)
+        if self._uniform.random() < self.spoof_probability:
+            latitude, longitude = adsb_decoder.airborne_position(df17_even, df17_odd)
+            altitude = adsb_decoder.altitude(df17_even)
 
             message = {
-                'drone_id': pms.adsb.icao(df17_even),
+                'drone_id': adsb_decoder.icao(df17_even),
                 'latitude': latitude,
                 'longitude': longitude,
                 'altitude': altitude
@@ -44,9 +50,17 @@ class Spoofer:
             spoofed_message['drone_id'] = message['drone_id']
             #print("[Spoofer] Spoofed message:", spoofed_message)
 
-            spoofed_df17_even, spoofed_df17_odd = ADSBMessage(
-                spoofed_message['drone_id'], spoofed_message['altitude'], spoofed_message['latitude'], spoofed_message['longitude']
-            ).encode()
+            adsb_message = self.spoofed_messages.get(spoofed_message['drone_id'])
+            if adsb_message is None:
+                adsb_message = ADSBMessage(
+                    spoofed_message['drone_id'], spoofed_message['altitude'], spoofed_message['latitude'], spoofed_message['longitude']
+                )
+                self.spoofed_messages[spoofed_message['drone_id']] = adsb_message
+                spoofed_df17_even, spoofed_df17_odd = adsb_message.encode()
+            else:
+                spoofed_df17_even, spoofed_df17_odd = adsb_message.update(
+                    altitude=spoofed_message['altitude'], lat=spoofed_message['latitude'], lon=spoofed_message['longitude']
+                )
             return spoofed_df17_even, spoofed_df17_odd, True
 
         return df17_even, df17_odd, False
@@ -88,9 +102,9 @@ class Spoofer:
 
             # # Introduce slight noise to prevent perfectly linear drift (makes spoofing more realistic)
             noise_factor = 0.0001
-            self.delta['latitude'] += random.uniform(-noise_factor, noise_factor)
-            self.delta['longitude'] += random.uniform(-noise_factor, noise_factor)
-            self.delta['altitude'] += random.uniform(-0.5, 0.5)
+            self.delta['latitude'] += self._uniform.uniform(-noise_factor, noise_factor)
+            self.delta['longitude'] += self._uniform.uniform(-noise_factor, noise_factor)
+            self.delta['altitude'] += self._uniform.uniform(-0.5, 0.5)
 
             # I believe above is not required anymore thanks to the nature "error" of ADS-B.
             # Each 17-bit field for latitude and longitude provides a quantization level of 2^17 = 131,072 discrete values.